@@ -1,22 +1,27 @@
-import pylewm.hotkeys
-import pylewm.commands
-import pylewm.monitors
-import pylewm.execution
-import pylewm.windows
-import pylewm.window
-import pylewm.window_classification
-import pylewm.window_drag
-import pylewm.space
-import pylewm.spaces
-import pylewm.yank
-import pylewm.selector
-import pylewm.filters
-import pylewm.wsltty
-import pylewm.config
-import pylewm.alt_mode
-import pylewm.dropdown
-import pylewm.zoom
-import pylewm.run
-import pylewm.tabs
+import os
 
-from pylewm.run import start, restart, quit
\ No newline at end of file
+# Helper processes such as the header renderer only need a few modules, skip loading the window manager there
+if not os.environ.get("PYLEWM_HELPER_PROCESS"):
+    import pylewm.hotkeys
+    import pylewm.commands
+    import pylewm.monitors
+    import pylewm.execution
+    import pylewm.windows
+    import pylewm.window
+    import pylewm.window_classification
+    import pylewm.window_drag
+    import pylewm.space
+    import pylewm.spaces
+    import pylewm.yank
+    import pylewm.selector
+    import pylewm.filters
+    import pylewm.wsltty
+    import pylewm.config
+    import pylewm.alt_mode
+    import pylewm.dropdown
+    import pylewm.zoom
+    import pylewm.run
+    import pylewm.tabs
+    import pylewm.perf
+
+    from pylewm.run import start, restart, quit
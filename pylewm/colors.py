@@ -1,3 +1,5 @@
+import functools
+
 def get_string_hash(string):
     # We do our own terrible hash because python's hash() is nondeterministic across application restarts
     strhash = 0
@@ -41,4 +43,15 @@ def get_text_color_for_background(bg_color):
     if luminance > 0.3:
         return (0, 0, 0)
     else:
-        return (255, 255, 255)
\ No newline at end of file
+        return (255, 255, 255)
+
+@functools.lru_cache(maxsize=512)
+def get_colors_for_str(string, dimmed=False):
+    """ Get the (background, text) rgb colors for a string, memoized since the hash is pure python. """
+    bg_color = get_random_color_for_str_hsv(string)
+    if dimmed:
+        bg_color[1] *= 0.4
+        bg_color[2] *= 0.4
+
+    bg_color = hsv_to_rgb(bg_color)
+    return bg_color, get_text_color_for_background(bg_color)
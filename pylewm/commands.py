@@ -153,9 +153,46 @@ def PyleTask(name=None, detail=None, condition=None):
         return task_function
     return decorator
 
-def PyleTaskGenerator(task_generator):
+class TaskGenerator:
+    """ Function returning a list of tasks, its result is reused until the ttl runs out or the cache key changes. """
+    def __init__(self, function, ttl=None, cache_key=None):
+        self.function = function
+        self.name = function.__name__
+        self.ttl = ttl
+        self.cache_key = cache_key
+
+        self.cached_tasks = None
+        self.cached_time = 0.0
+        self.cached_key = None
+
+    def get_cached_tasks(self):
+        if self.cached_tasks is None:
+            return None
+        # Without a ttl or cache key the generator runs every time
+        if self.ttl is None and self.cache_key is None:
+            return None
+        if self.ttl is not None and time.monotonic() - self.cached_time > self.ttl:
+            return None
+        if self.cache_key is not None and self.cache_key() != self.cached_key:
+            return None
+        return self.cached_tasks
+
+    def generate(self):
+        key = self.cache_key() if self.cache_key is not None else None
+        tasks = list(self.function())
+
+        self.cached_tasks = tasks
+        self.cached_time = time.monotonic()
+        self.cached_key = key
+        return tasks
+
+def PyleTaskGenerator(generator_function=None, ttl=None, cache_key=None):
+    """ Register a function that returns a list of tasks, each with a task_name and task_detail like PyleTask sets. """
     def decorator(generator_function):
         global TASK_GENERATORS
-        TASK_GENERATORS.append(generator_function)
+        TASK_GENERATORS.append(TaskGenerator(generator_function, ttl, cache_key))
         return generator_function
+
+    if generator_function is not None:
+        return decorator(generator_function)
     return decorator
\ No newline at end of file
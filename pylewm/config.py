@@ -16,6 +16,25 @@ TilingInnerMargin = 0
 # The margin between a window and the edge of the monitor
 TilingOuterMargin = [0, 0, 0, 1]
 
+# How tab headers are drawn: "thread" draws them from a thread inside PyleWM, which starts faster
+# and uses less memory but shares the interpreter with the window manager,
+# "process" draws them from a small separate python process (not available in the frozen PyleWM.exe)
+HeaderRenderer = "thread"
+
+# Run the low-level keyboard and mouse hooks in a small separate process,
+# so a busy PyleWM can never delay input for the rest of the system (not available in the frozen PyleWM.exe)
+InputHookProcess = False
+
+# Load the overlay used by hint modes and the window switcher in the background at startup,
+# so the first time one of them is used it doesn't have to wait for it to be created
+PrewarmOverlay = True
+
+# Folders searched by the file launcher (pylewm.modes.select_file.run_file),
+# their contents are indexed in the background and kept up to date as files change
+FileLauncherFolders = []
+# Files and folders with these names are left out of the file launcher's index
+FileLauncherIgnoredNames = [".git", ".svn", "node_modules", "__pycache__"]
+
 # Whitelisted window classes that can use "responsive placement mode", to tile them
 # before they become visible to improve the responsiveness of window management
 WHITELIST_INTERACTIBLE_CLASSES = [
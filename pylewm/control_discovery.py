@@ -0,0 +1,122 @@
+import pylewm.perf
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+
+import pywinauto
+import pywinauto.uia_defines
+
+HINTABLE_CONTROL_TYPES = ("Button", "TabItem", "MenuItem", "Edit", "ListItem", "TreeItem", "SplitButton", "CheckBox", "ComboBox", "Hyperlink")
+
+class UiaControlSource:
+    """ Finds controls through windows UI automation, one subtree of the window at a time. """
+    def __init__(self):
+        self.condition = None
+
+    def get_condition(self, iuia):
+        if self.condition is None:
+            condition_list = []
+            for type_name in HINTABLE_CONTROL_TYPES:
+                condition_list.append(iuia.iuia.CreatePropertyCondition(
+                    iuia.UIA_dll.UIA_ControlTypePropertyId,
+                    iuia.known_control_types[type_name]
+                ))
+            self.condition = iuia.iuia.CreateOrConditionFromArray(condition_list)
+        return self.condition
+
+    def is_control_interactable(self, control):
+        control_class = control.friendly_class_name()
+        if control_class == "Edit":
+            if not control.is_editable():
+                return False
+        return True
+
+    def find_controls(self, hwnd):
+        """ Yield batches of (control, screen rect) as they are found. """
+        uia_desktop = pywinauto.Desktop(backend="uia", allow_magic_lookup=False)
+        uia_wrapper = uia_desktop.window(handle=hwnd).wrapper_object()
+
+        iuia = pywinauto.uia_defines.IUIA()
+        condition = self.get_condition(iuia)
+
+        # Searching each top level subtree separately lets the first controls
+        # show up long before a deep subtree like a browser's document is done
+        element_info = uia_wrapper._element_info
+        subtrees = element_info._get_elements(iuia.tree_scope["children"], iuia.true_condition, True)
+        for subtree in subtrees:
+            batch = []
+            for element in subtree._get_elements(iuia.tree_scope["subtree"], condition, True):
+                control = uia_wrapper.backend.generic_wrapper_class(element)
+                if not self.is_control_interactable(control):
+                    continue
+                control_rect = control.rectangle()
+                batch.append((control, (control_rect.left, control_rect.top, control_rect.right, control_rect.bottom)))
+            if batch:
+                yield batch
+
+Source = UiaControlSource()
+
+# Controls wrap UI automation COM objects, which are only safe to use on the thread that created them.
+# Finding controls and acting on them both happen on this one thread, so cached controls stay usable.
+UiaThread = ThreadPoolExecutor(max_workers=1)
+
+def set_source(source):
+    global Source
+    Source = source
+
+class ControlCacheEntry:
+    def __init__(self, title, rect):
+        self.title = title
+        self.rect = rect
+        self.time = time.time()
+        self.controls = []
+
+class ControlCache:
+    # How long found controls are reused for a window that hasn't changed title or position
+    TimeToLive = 30.0
+
+    Lock = threading.Lock()
+    # HWND -> ControlCacheEntry
+    Entries = {}
+
+def get_cached_controls(hwnd, title, rect):
+    """ Get the controls found earlier for a window, or None if they may no longer be accurate. """
+    with ControlCache.Lock:
+        entry = ControlCache.Entries.get(hwnd)
+        if (entry is None or entry.title != title or entry.rect != rect
+                or time.time() - entry.time > ControlCache.TimeToLive):
+            pylewm.perf.count("Control cache misses")
+            return None
+        pylewm.perf.count("Control cache hits")
+        return list(entry.controls)
+
+def discover_controls(hwnd, title, rect, should_stop=None):
+    """ Yield batches of (control, screen rect) for a window, from the cache if it is still valid. """
+    cached = get_cached_controls(hwnd, title, rect)
+    if cached is not None:
+        yield cached
+        return
+
+    start_time = time.perf_counter()
+    entry = ControlCacheEntry(title, rect)
+    for batch in Source.find_controls(hwnd):
+        entry.controls += batch
+        yield batch
+        if should_stop and should_stop():
+            # A partial walk can't be reused, the next time will have to start over
+            return
+
+    pylewm.perf.record_since("Control discovery time", start_time)
+    with ControlCache.Lock:
+        now = time.time()
+        for expired_hwnd in [key for key, value in ControlCache.Entries.items() if now - value.time > ControlCache.TimeToLive]:
+            del ControlCache.Entries[expired_hwnd]
+        ControlCache.Entries[hwnd] = entry
+
+def get_expected_count(hwnd):
+    """ How many controls the window had the last time we looked, or None if we haven't. """
+    with ControlCache.Lock:
+        entry = ControlCache.Entries.get(hwnd)
+        if entry is None:
+            return None
+        return len(entry.controls)
@@ -4,6 +4,7 @@ import pylewm.window
 import pylewm.execution
 import pylewm.window_update
 import pylewm.window
+import pylewm.window_index
 import pylewm.focus
 import time
 import win32gui
@@ -30,10 +31,12 @@ def make_window_dropdown(window):
     if previous_window:
         if previous_window.hidden:
             previous_window.is_dropdown = False
+            pylewm.window_index.window_changed(previous_window)
             previous_window.show()
 
     DROPDOWN_WINDOW = window
     window.is_dropdown = True
+    pylewm.window_index.window_changed(window)
 
 @PyleCommand
 def toggle_dropdown(command_if_no_dropdown=None):
@@ -96,7 +99,9 @@ def update_dropdown():
         if not window.wm_hidden:
             if not window.is_floating():
                 window.is_dropdown = False
+                pylewm.window_index.window_changed(window)
                 DROPDOWN_WINDOW = None
             elif window != pylewm.focus.FocusWindow and not window.wm_becoming_visible and time.time() > DROPDOWN_SHOW_TIME + 1.0:
                 window.is_dropdown = True
+                pylewm.window_index.window_changed(window)
                 window.hide()
\ No newline at end of file
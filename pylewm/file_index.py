@@ -0,0 +1,356 @@
+""" Trigram index of the files in a set of folders. """
+
+import threading
+import pickle
+import struct
+import heapq
+import mmap
+import os
+from array import array
+from bisect import bisect_right
+import numpy as np
+
+INDEX_MAGIC = b"PYLT"
+INDEX_VERSION = 2
+
+# Set on the keys of trigrams that appear in the file name itself, not just somewhere in its path
+NAME_KEY_FLAG = 1 << 24
+
+# Magic, version, path count, trigram count
+HEADER_FORMAT = "<4sIII"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+
+def get_trigram_key(a, b, c):
+    # Characters are folded to a byte each, collisions only let a few extra candidates through to be verified
+    return ((ord(a) & 0xFF) << 16) | ((ord(b) & 0xFF) << 8) | (ord(c) & 0xFF)
+
+def get_trigram_keys(text):
+    return {get_trigram_key(text[i], text[i+1], text[i+2]) for i in range(len(text) - 2)}
+
+def get_name_start(search_text):
+    return search_text.rfind(os.sep) + 1
+
+def get_search_text(root, path):
+    """ The part of a path that is searched, relative to the folder it was found in. """
+    return os.path.join(os.path.basename(root), os.path.relpath(path, root)).lower()
+
+def intersect_sorted(candidates, posting):
+    """ The ids of a sorted candidate array that also appear in a sorted posting array. """
+    if len(candidates) == 0 or len(posting) == 0:
+        return candidates[:0]
+    indices = np.searchsorted(posting, candidates)
+    np.minimum(indices, len(posting) - 1, out=indices)
+    return candidates[posting[indices] == candidates]
+
+class FileIndex:
+    """ Index of all files in a set of folders, with trigram posting lists stored in a memory-mapped file. """
+
+    # Queries that match a large part of the index, such as a file extension, only score this many candidates
+    MaxScoredCandidates = 2000
+
+    def __init__(self, folders, index_dir, ignored_names=()):
+        self.folders = list(folders)
+        self.index_dir = index_dir
+        self.ignored_names = frozenset(name.lower() for name in ignored_names)
+
+        # Directory path -> (mtime, [subdirectory paths], [file names])
+        self.dirs = {}
+        self.paths = []
+        self.search_texts = []
+        # All search texts joined by newlines, and where each one starts, to scan for phrases too short for trigrams
+        self.search_blob = ""
+        self.search_starts = []
+
+        self.postings_name = None
+        self.postings_file = None
+        self.postings_map = None
+        self.postings_array = None
+        # Trigram key -> (offset, length) into postings_array
+        self.trigrams = {}
+
+        self.loaded = False
+        self.lock = threading.Lock()
+        self.refresh_thread = None
+
+    def get_state_path(self):
+        return os.path.join(self.index_dir, "FileIndex.pickle")
+
+    def load(self):
+        try:
+            with open(self.get_state_path(), "rb") as state_file:
+                state = pickle.load(state_file)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return False
+
+        if state.get("version") != INDEX_VERSION or state.get("folders") != self.folders:
+            return False
+
+        if not self.open_postings(state["postings_name"], len(state["paths"])):
+            return False
+
+        self.dirs = state["dirs"]
+        self.set_paths(state["paths"])
+        self.loaded = True
+        return True
+
+    def save_state(self):
+        state = {
+            "version": INDEX_VERSION,
+            "folders": self.folders,
+            "dirs": self.dirs,
+            "paths": self.paths,
+            "postings_name": self.postings_name,
+        }
+
+        temp_path = self.get_state_path() + ".tmp"
+        with open(temp_path, "wb") as state_file:
+            pickle.dump(state, state_file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, self.get_state_path())
+
+    def set_paths(self, paths):
+        search_texts = []
+        for root, path in paths:
+            search_texts.append(get_search_text(root, path))
+        self.paths = paths
+        self.set_search_texts(search_texts)
+
+    def set_search_texts(self, search_texts):
+        search_starts = []
+        position = 0
+        for text in search_texts:
+            search_starts.append(position)
+            position += len(text) + 1
+        self.search_texts = search_texts
+        self.search_blob = "\n".join(search_texts)
+        self.search_starts = search_starts
+
+    def open_postings(self, postings_name, path_count):
+        try:
+            postings_file = open(os.path.join(self.index_dir, postings_name), "rb")
+        except OSError:
+            return False
+
+        try:
+            postings_map = mmap.mmap(postings_file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            postings_file.close()
+            return False
+
+        magic, version, stored_path_count, trigram_count = struct.unpack_from(HEADER_FORMAT, postings_map, 0)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION or stored_path_count != path_count:
+            postings_map.close()
+            postings_file.close()
+            return False
+
+        table = memoryview(postings_map)[HEADER_SIZE:HEADER_SIZE + trigram_count * 12].cast("I")
+        trigrams = {}
+        for i in range(0, trigram_count * 3, 3):
+            trigrams[table[i]] = (table[i+1], table[i+2])
+        table.release()
+
+        self.close_postings()
+        self.postings_name = postings_name
+        self.postings_file = postings_file
+        self.postings_map = postings_map
+        self.postings_array = np.frombuffer(postings_map, dtype=np.uint32, offset=HEADER_SIZE + trigram_count * 12)
+        self.trigrams = trigrams
+        return True
+
+    def close_postings(self):
+        # The array has to go before the map, which can't be closed while it is still referenced
+        self.postings_array = None
+        if self.postings_map is not None:
+            self.postings_map.close()
+            self.postings_map = None
+        if self.postings_file is not None:
+            self.postings_file.close()
+            self.postings_file = None
+
+    def write_postings(self, search_texts):
+        postings = {}
+        for path_id, text in enumerate(search_texts):
+            name_keys = {key | NAME_KEY_FLAG for key in get_trigram_keys(text[get_name_start(text):])}
+            for key in get_trigram_keys(text) | name_keys:
+                posting = postings.get(key)
+                if posting is None:
+                    posting = array("I")
+                    postings[key] = posting
+                posting.append(path_id)
+
+        # Mapped files can't be replaced on Windows, so each rebuild goes to a new file
+        generation = 0
+        if self.postings_name:
+            generation = int(self.postings_name.split(".")[1]) + 1
+        postings_name = f"FilePostings.{generation}.bin"
+
+        keys = sorted(postings.keys())
+        table = array("I")
+        offset = 0
+        for key in keys:
+            table.extend((key, offset, len(postings[key])))
+            offset += len(postings[key])
+
+        with open(os.path.join(self.index_dir, postings_name), "wb") as postings_file:
+            postings_file.write(struct.pack(HEADER_FORMAT, INDEX_MAGIC, INDEX_VERSION, len(search_texts), len(keys)))
+            postings_file.write(table.tobytes())
+            for key in keys:
+                postings_file.write(postings[key].tobytes())
+        return postings_name
+
+    def scan_dir(self, path):
+        subdirs = []
+        files = []
+        mtime = 0
+        try:
+            mtime = os.stat(path).st_mtime
+            with os.scandir(path) as it:
+                for entry in it:
+                    if entry.name.lower() in self.ignored_names:
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                    else:
+                        files.append(entry.name)
+        except OSError:
+            pass
+        return (mtime, subdirs, files)
+
+    def refresh(self):
+        """ Rescan directories whose mtime changed, and rebuild the postings if any files were added or removed. """
+        new_dirs = {}
+        paths = []
+        rescanned = 0
+
+        for root in self.folders:
+            pending = [root]
+            while pending:
+                path = pending.pop()
+                if path in new_dirs:
+                    continue
+
+                info = self.dirs.get(path)
+                try:
+                    mtime = os.stat(path).st_mtime
+                except OSError:
+                    continue
+                if not info or info[0] != mtime:
+                    info = self.scan_dir(path)
+                    rescanned += 1
+
+                new_dirs[path] = info
+                for name in info[2]:
+                    paths.append((root, os.path.join(path, name)))
+                pending.extend(reversed(info[1]))
+
+        if rescanned == 0 and new_dirs.keys() == self.dirs.keys() and self.loaded:
+            return rescanned
+
+        search_texts = [get_search_text(root, path) for root, path in paths]
+        os.makedirs(self.index_dir, exist_ok=True)
+        postings_name = self.write_postings(search_texts)
+
+        with self.lock:
+            old_postings_name = self.postings_name
+            if not self.open_postings(postings_name, len(paths)):
+                return rescanned
+            self.dirs = new_dirs
+            self.paths = paths
+            self.set_search_texts(search_texts)
+            self.loaded = True
+
+        self.save_state()
+        if old_postings_name and old_postings_name != postings_name:
+            try:
+                os.remove(os.path.join(self.index_dir, old_postings_name))
+            except OSError:
+                pass
+        return rescanned
+
+    def refresh_async(self):
+        with self.lock:
+            if self.refresh_thread and self.refresh_thread.is_alive():
+                return self.refresh_thread
+            self.refresh_thread = threading.Thread(target=self.refresh, daemon=True)
+            self.refresh_thread.start()
+            return self.refresh_thread
+
+    def get_candidates(self, phrases, in_name=False):
+        """ Sorted array of ids of the paths that contain every trigram of the phrases, or None if the phrases are too short to narrow down. """
+        key_flag = NAME_KEY_FLAG if in_name else 0
+        postings = []
+        for phrase in phrases:
+            for key in get_trigram_keys(phrase):
+                location = self.trigrams.get(key | key_flag)
+                if location is None:
+                    return self.postings_array[:0]
+                offset, length = location
+                postings.append(self.postings_array[offset:offset+length])
+
+        if not postings:
+            return None
+
+        # Start from the rarest trigram, every other posting can only narrow it down further
+        postings.sort(key=len)
+        candidates = postings[0]
+        for posting in postings[1:]:
+            candidates = intersect_sorted(candidates, posting)
+            if len(candidates) == 0:
+                break
+        return candidates
+
+    def scan_candidates(self, phrase, limit):
+        """ Ids of the paths containing a phrase too short to have trigrams, found by scanning the search texts. """
+        candidates = []
+        position = self.search_blob.find(phrase)
+        while position != -1 and len(candidates) < limit:
+            path_id = bisect_right(self.search_starts, position) - 1
+            candidates.append(path_id)
+            # Continue after this path, it only needs to be found once
+            next_start = self.search_starts[path_id+1] if path_id+1 < len(self.search_starts) else len(self.search_blob)
+            position = self.search_blob.find(phrase, next_start)
+        return candidates
+
+    def query(self, text, limit):
+        """ Get the (score, root, path) of the best matching files, best first. """
+        phrases = text.lower().split()
+        if not phrases:
+            return []
+
+        with self.lock:
+            if not self.loaded:
+                return []
+
+            candidates = self.get_candidates(phrases)
+            if candidates is None:
+                candidates = self.scan_candidates(max(phrases, key=len), self.MaxScoredCandidates)
+            elif len(candidates) > self.MaxScoredCandidates:
+                # Too many to score them all, files with the last phrase in their name score highest so they go first
+                prioritized = candidates[:0]
+                name_candidates = self.get_candidates(phrases[-1:], in_name=True)
+                if name_candidates is not None:
+                    prioritized = intersect_sorted(name_candidates, candidates)[:self.MaxScoredCandidates]
+                if len(prioritized) < self.MaxScoredCandidates:
+                    rest = np.setdiff1d(candidates, prioritized, assume_unique=True)
+                    prioritized = np.concatenate((prioritized, rest[:self.MaxScoredCandidates - len(prioritized)]))
+                candidates = prioritized.tolist()
+            else:
+                candidates = candidates.tolist()
+
+            results = []
+            for path_id in candidates:
+                search_text = self.search_texts[path_id]
+                if not all(phrase in search_text for phrase in phrases):
+                    continue
+
+                name = search_text[get_name_start(search_text):]
+                score = 100
+                if phrases[-1] in name:
+                    score += 100
+                if name.startswith(phrases[0]):
+                    score += 50
+                # Prefer shallow and short paths among equally good matches
+                score -= len(search_text) * 0.1
+                results.append((score, -path_id))
+
+            best = heapq.nlargest(limit, results)
+            return [(score, *self.paths[-negative_id]) for score, negative_id in best]
@@ -83,6 +83,14 @@ def AddedBorders(window, border_size):
     """ Force this window to have borders of a particular size in positioning. """
     window.layout_margin = (True, border_size)
 
+@Filter
+def SizeLimits(window, min_size=None, max_size=None):
+    """ Give the window a (width, height) minimum and/or maximum size when tiled, 0 means unconstrained. """
+    if min_size:
+        window.layout_min_size = tuple(min_size)
+    if max_size:
+        window.layout_max_size = tuple(max_size)
+
 @Filter.post
 def TemporarySpace(window):
     """ The window gets a new desktop on its monitor when spawned. """
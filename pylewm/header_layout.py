@@ -0,0 +1,43 @@
+""" Layout math for tab headers: where each entry is drawn and how much of its title fits. """
+
+TEXT_PADDING = 10
+
+def get_entry_boxes(width, entry_count):
+    """ Get the (x, width) of each tab in a header, the last tab takes up any leftover pixels. """
+    if entry_count <= 0:
+        return []
+
+    entry_width = width // entry_count
+    boxes = []
+    for i in range(0, entry_count):
+        x = entry_width * i
+        if i == entry_count-1:
+            boxes.append((x, width - x))
+        else:
+            boxes.append((x, entry_width))
+    return boxes
+
+def get_entry_index_at(x, width, entry_count):
+    """ Get the index of the tab at a horizontal position in the header. """
+    if entry_count <= 0:
+        return None
+
+    entry_width = width // entry_count
+    if entry_width <= 0:
+        return entry_count-1
+    return min(max(x, 0) // entry_width, entry_count-1)
+
+def get_text_rect(box_width, height):
+    """ Get the (left, top, right, bottom) rect that a tab's title is drawn in. """
+    return (TEXT_PADDING, 0, max(box_width - TEXT_PADDING, TEXT_PADDING), height)
+
+def get_entry_key(entry, box_width, height, pending):
+    """ Key that identifies how a tab looks, if this is the same the tab doesn't need to be redrawn. """
+    return (
+        entry["title"],
+        tuple(entry["bg_color"]),
+        tuple(entry["text_color"]),
+        box_width,
+        height,
+        pending,
+    )
@@ -1,28 +1,126 @@
-import multiprocessing
 import pylewm.winproxy.winfuncs as winfuncs
+import pylewm.header_layout as header_layout
 from pylewm.rects import Rect
+from collections import OrderedDict
 import ctypes as c
 import ctypes.wintypes as w
 
 import win32con
+import pickle
+import queue
 import time
 import threading
 import faulthandler
+import sys
 
-CommandQueue : multiprocessing.Queue = None
-OutputQueue : multiprocessing.Queue = None
+CommandQueue : queue.Queue = None
+OutputQueue : queue.Queue = None
+
+class ConnectionOutput:
+    """ Sends output back to the main process when we're running as a separate process. """
+    def __init__(self, connection):
+        self.connection = connection
+
+    def put(self, cmd):
+        self.connection.send(cmd)
 
 class RenderState:
     TitleFont = None
+    Brushes : dict[int, int] = {}
+    # Rendered tab bitmaps, keyed by how the tab looks
+    EntryBitmaps : OrderedDict = OrderedDict()
+    MaxEntryBitmaps = 128
+    BitmapDC = None
+    CacheHits = 0
+    CacheMisses = 0
     Running = False
     Headers : dict[int, 'RenderHeaderWindow'] = {}
+    HeadersByHwnd : dict[int, 'RenderHeaderWindow'] = {}
     ClassPtr = None
     WndProc = None
+    ThreadId = None
+
+# Posted to the renderer thread to wake it up when a command is queued
+WM_PYLEWM_COMMAND = win32con.WM_APP + 1
+# Timer used to re-check the header after the grace period of a tab switch
+GRACE_TIMER_ID = 1
+GRACE_PERIOD = 0.3
+
+def to_colorref(color):
+    return int(color[0])|int(color[1])<<8|int(color[2])<<16
+
+def get_title_font():
+    if not RenderState.TitleFont:
+        RenderState.TitleFont = winfuncs.CreateFontW(
+            16, 0, 0, 0, win32con.FW_BOLD,
+            0, 0, 0, win32con.DEFAULT_CHARSET, win32con.OUT_OUTLINE_PRECIS,
+            win32con.CLIP_DEFAULT_PRECIS, win32con.CLEARTYPE_QUALITY, win32con.VARIABLE_PITCH,
+            "Terminus (TTF) for Windows",
+        )
+    return RenderState.TitleFont
+
+def get_brush(color):
+    colorref = to_colorref(color)
+    brush = RenderState.Brushes.get(colorref)
+    if brush is None:
+        brush = winfuncs.CreateSolidBrush(colorref)
+        RenderState.Brushes[colorref] = brush
+    return brush
+
+def get_bitmap_dc():
+    if not RenderState.BitmapDC:
+        RenderState.BitmapDC = winfuncs.CreateCompatibleDC(None)
+    return RenderState.BitmapDC
+
+def get_entry_bitmap(reference_dc, entry, box_width, height, pending):
+    key = header_layout.get_entry_key(entry, box_width, height, pending)
+    bitmap = RenderState.EntryBitmaps.get(key)
+    if bitmap:
+        RenderState.EntryBitmaps.move_to_end(key)
+        RenderState.CacheHits += 1
+        return bitmap
+
+    RenderState.CacheMisses += 1
+    bitmap = winfuncs.CreateCompatibleBitmap(reference_dc, box_width, height)
+
+    dc = winfuncs.CreateCompatibleDC(reference_dc)
+    prev_bitmap = winfuncs.SelectObject(dc, bitmap)
+
+    winfuncs.SelectObject(dc, get_brush(entry["bg_color"]))
+    winfuncs.Rectangle(dc, 0, 0, box_width, height)
+
+    winfuncs.SetBkMode(dc, win32con.TRANSPARENT)
+    winfuncs.SetTextColor(dc, to_colorref(entry["text_color"]))
+    winfuncs.SelectObject(dc, get_title_font())
+
+    text_rect = w.RECT(*header_layout.get_text_rect(box_width, height))
+    winfuncs.DrawTextW(dc,
+        entry["title"], len(entry["title"]),
+        c.pointer(text_rect),
+        win32con.DT_WORD_ELLIPSIS | win32con.DT_NOPREFIX | win32con.DT_VCENTER | win32con.DT_SINGLELINE
+    )
+
+    if pending:
+        glyph = "-PENDING-"
+        winfuncs.DrawTextW(dc,
+            glyph, len(glyph),
+            c.pointer(text_rect),
+            win32con.DT_WORD_ELLIPSIS | win32con.DT_NOPREFIX | win32con.DT_RIGHT | win32con.DT_VCENTER | win32con.DT_SINGLELINE
+        )
+
+    winfuncs.SelectObject(dc, prev_bitmap)
+    winfuncs.DeleteDC(dc)
+
+    RenderState.EntryBitmaps[key] = bitmap
+    while len(RenderState.EntryBitmaps) > RenderState.MaxEntryBitmaps:
+        old_key, old_bitmap = RenderState.EntryBitmaps.popitem(last=False)
+        winfuncs.DeleteObject(old_bitmap)
+    return bitmap
 
 def window_proc(hwnd, message, wParam, lParam):
-    for id, header in RenderState.Headers.items():
-        if header.hwnd == hwnd:
-            return header.handle_message(message, wParam, lParam)
+    header = RenderState.HeadersByHwnd.get(hwnd)
+    if header:
+        return header.handle_message(message, wParam, lParam)
     return winfuncs.DefWindowProcW(hwnd, message, wParam, lParam)
 
 def create_class():
@@ -56,6 +154,12 @@ class RenderHeaderWindow:
         self.header_id = header_id
         self.repaint = True
         self.last_paint = 0
+
+        # Off-screen copy of the header, and what is drawn in each tab slot of it
+        self.buffer_dc = None
+        self.buffer_bitmap = None
+        self.buffer_size = (0, 0)
+        self.buffer_slots = []
         self.set_timestamp = 0
         self.create_timestamp = time.time() 
         self.hwnd_change_timestamp = 0
@@ -63,11 +167,14 @@ class RenderHeaderWindow:
         self.visible = True
         self.applied_position = []
 
+        # Target geometry and visibility, as pushed by the main process
+        self.target_rect = None
+        self.target_visible = False
+
         module_handle = winfuncs.GetModuleHandleW(None)
 
         self.window_class = "PyleWM_Header"
         self.window_title = "PyleWM_Header"
-        self.target_position = winfuncs.w.RECT()
         create_class()
         
         self.hwnd = winfuncs.CreateWindowExW(
@@ -84,6 +191,7 @@ class RenderHeaderWindow:
         winfuncs.SetWindowPos(self.hwnd, winfuncs.HWND_TOPMOST, 0, 0, 0, 0, winfuncs.SWP_NOACTIVATE | winfuncs.SWP_NOMOVE | winfuncs.SWP_NOSIZE | winfuncs.SWP_ASYNCWINDOWPOS | winfuncs.SWP_NOREDRAW)
 
         RenderState.Headers[header_id] = self
+        RenderState.HeadersByHwnd[self.hwnd] = self
 
     def set(self, target_hwnd, entries, state):
         if target_hwnd != self.target_hwnd:
@@ -93,78 +201,127 @@ class RenderHeaderWindow:
         self.state = state
         self.set_timestamp = time.time()
         self.update()
-        self.repaint = True
-        winfuncs.InvalidateRect(self.hwnd, None, False)
+        self.invalidate_changed_slots()
 
-    def to_colorref(self, color):
-        return int(color[0])|int(color[1])<<8|int(color[2])<<16
+    def set_delta(self, target_hwnd, entry_count, changed, state):
+        entries = self.entries[:entry_count]
+        while len(entries) < entry_count:
+            entries.append(None)
+        for index, entry in changed.items():
+            entries[index] = entry
 
-    def paint(self):
-        self.repaint = False
-        self.last_paint = time.time()
+        if state is None:
+            state = self.state
+        self.set(target_hwnd, entries, state)
 
-        if not RenderState.TitleFont:
-            RenderState.TitleFont = c.windll.gdi32.CreateFontW(
-                16, 0, 0, 0, win32con.FW_BOLD,
-                0, 0, 0, win32con.DEFAULT_CHARSET, win32con.OUT_OUTLINE_PRECIS,
-                win32con.CLIP_DEFAULT_PRECIS, win32con.CLEARTYPE_QUALITY, win32con.VARIABLE_PITCH,
-                "Terminus (TTF) for Windows",
-            )
+    def set_target(self, target_hwnd, target_rect, target_visible):
+        if target_hwnd != self.target_hwnd:
+            self.target_hwnd = target_hwnd
+            self.hwnd_change_timestamp = time.time()
+        self.target_rect = target_rect
+        self.target_visible = target_visible
+        self.update()
 
-        ps = winfuncs.PAINTSTRUCT()
-        dc = c.windll.user32.BeginPaint(self.hwnd, c.byref(ps))
+    def schedule_update(self, delay):
+        c.windll.user32.SetTimer(self.hwnd, GRACE_TIMER_ID, max(int(delay * 1000.0), 1), None)
+
+    def get_slots(self):
+        """ Get the (x, width, key) that each tab should be drawn with. """
+        if not self.applied_position:
+            return []
 
         width = self.applied_position[2]
         height = self.applied_position[3]
-        
-        border_pen = c.windll.gdi32.CreatePen(win32con.PS_SOLID, self.to_colorref((0, 0, 0)))
-
-        if self.entries:
-            entry_width = width // len(self.entries)
-            for i, entry in enumerate(self.entries):
-                x = entry_width*i
-
-                box_width = entry_width
-
-                is_last_entry = i == len(self.entries)-1
-                if is_last_entry:
-                    box_width = width-x
-
-                bg_brush = c.windll.gdi32.CreateSolidBrush(self.to_colorref(entry["bg_color"]))
-
-                c.windll.gdi32.SelectObject(dc, bg_brush)
-                c.windll.gdi32.Rectangle(dc, x, 0, x+box_width, height)
+        pending = self.state.get("pending", False)
+
+        slots = []
+        boxes = header_layout.get_entry_boxes(width, len(self.entries))
+        for i, (x, box_width) in enumerate(boxes):
+            is_pending = pending and i == len(boxes)-1
+            slots.append((x, box_width, is_pending, header_layout.get_entry_key(self.entries[i], box_width, height, is_pending)))
+        return slots
+
+    def invalidate_changed_slots(self):
+        slots = self.get_slots()
+        if len(slots) != len(self.buffer_slots):
+            self.repaint = True
+            winfuncs.InvalidateRect(self.hwnd, None, False)
+            return
 
-                c.windll.gdi32.SetBkMode(dc, win32con.TRANSPARENT)
-                c.windll.gdi32.SetTextColor(dc, self.to_colorref(entry["text_color"]))
+        for slot, buffer_slot in zip(slots, self.buffer_slots):
+            if slot != buffer_slot:
+                self.repaint = True
+                x, box_width, is_pending, key = slot
+                slot_rect = w.RECT(x, 0, x + box_width, self.applied_position[3])
+                winfuncs.InvalidateRect(self.hwnd, c.byref(slot_rect), False)
 
-                text_rect = w.RECT()
-                text_rect.left = x+10
-                text_rect.right = x+box_width-10
-                text_rect.top = 0
-                text_rect.bottom = height
+    def ensure_buffer(self, reference_dc, width, height):
+        if self.buffer_dc and self.buffer_size == (width, height):
+            return
 
-                c.windll.gdi32.SelectObject(dc, RenderState.TitleFont)
+        self.free_buffer()
+        self.buffer_dc = winfuncs.CreateCompatibleDC(reference_dc)
+        self.buffer_bitmap = winfuncs.CreateCompatibleBitmap(reference_dc, width, height)
+        winfuncs.SelectObject(self.buffer_dc, self.buffer_bitmap)
+        self.buffer_size = (width, height)
+        self.buffer_slots = []
 
-                c.windll.user32.DrawTextW(dc,
-                    entry["title"], len(entry["title"]),
-                    c.pointer(text_rect),
-                    win32con.DT_WORD_ELLIPSIS | win32con.DT_NOPREFIX | win32con.DT_VCENTER | win32con.DT_SINGLELINE
-                )
+    def free_buffer(self):
+        if self.buffer_dc:
+            winfuncs.DeleteDC(self.buffer_dc)
+            winfuncs.DeleteObject(self.buffer_bitmap)
+            self.buffer_dc = None
+            self.buffer_bitmap = None
 
-                if is_last_entry and self.state.get("pending", False):
-                    glyph = "-PENDING-"
-                    c.windll.user32.DrawTextW(dc,
-                        glyph, len(glyph),
-                        c.pointer(text_rect),
-                        win32con.DT_WORD_ELLIPSIS | win32con.DT_NOPREFIX | win32con.DT_RIGHT | win32con.DT_VCENTER | win32con.DT_SINGLELINE
-                    )
+    def paint(self):
+        start_time = time.perf_counter()
+        start_hits = RenderState.CacheHits
+        start_misses = RenderState.CacheMisses
 
-                c.windll.gdi32.DeleteObject(bg_brush)
+        self.repaint = False
+        self.last_paint = time.time()
 
+        ps = winfuncs.PAINTSTRUCT()
+        dc = winfuncs.BeginPaint(self.hwnd, c.byref(ps))
+        redrawn_count = 0
+
+        if self.applied_position and self.entries:
+            width = self.applied_position[2]
+            height = self.applied_position[3]
+            self.ensure_buffer(dc, width, height)
+
+            # Only tabs that look different from what's in the buffer are copied into it
+            slots = self.get_slots()
+            bitmap_dc = get_bitmap_dc()
+            for i, slot in enumerate(slots):
+                if i < len(self.buffer_slots) and self.buffer_slots[i] == slot:
+                    continue
+
+                x, box_width, is_pending, key = slot
+                bitmap = get_entry_bitmap(dc, self.entries[i], box_width, height, is_pending)
+                prev_bitmap = winfuncs.SelectObject(bitmap_dc, bitmap)
+                winfuncs.BitBlt(self.buffer_dc, x, 0, box_width, height, bitmap_dc, 0, 0, win32con.SRCCOPY)
+                winfuncs.SelectObject(bitmap_dc, prev_bitmap)
+                redrawn_count += 1
+            self.buffer_slots = slots
+
+            paint_rect = ps.rcPaint
+            winfuncs.BitBlt(dc,
+                paint_rect.left, paint_rect.top,
+                paint_rect.right - paint_rect.left, paint_rect.bottom - paint_rect.top,
+                self.buffer_dc, paint_rect.left, paint_rect.top, win32con.SRCCOPY)
+
+        winfuncs.EndPaint(self.hwnd, c.byref(ps))
+
+        # Paints that only copy the buffer back to the window aren't worth a message
+        if redrawn_count == 0:
+            return
 
-        c.windll.gdi32.DeleteObject(border_pen)
-        dc = c.windll.user32.EndPaint(self.hwnd, c.byref(ps))
+        OutputQueue.put([None, "paint",
+            time.perf_counter() - start_time,
+            RenderState.CacheHits - start_hits,
+            RenderState.CacheMisses - start_misses,
+        ])
 
     def update(self):
         if self.closed:
@@ -175,12 +332,11 @@ class RenderHeaderWindow:
 
     def update_visibility(self):
         should_show = False
-        if not winfuncs.IsWindow(self.target_hwnd):
-            should_show = False
-        elif winfuncs.IsWindowVisible(self.target_hwnd):
+        if self.target_visible:
             should_show = True
-        elif time.time() - self.set_timestamp < 0.3:
+        elif time.time() - self.set_timestamp < GRACE_PERIOD:
             should_show = True
+            self.schedule_update(GRACE_PERIOD - (time.time() - self.set_timestamp))
 
         if should_show:
             if not self.visible:
@@ -195,18 +351,18 @@ class RenderHeaderWindow:
         self.hwnd_change_timestamp = 0.0
 
     def update_position(self):
-        if self.applied_position and time.time() - self.hwnd_change_timestamp < 0.3 and time.time() - self.create_timestamp > 0.3:
+        if self.target_rect is None:
             return
-        if not winfuncs.IsWindow(self.target_hwnd):
-            return
-        has_rect = winfuncs.GetWindowRect(self.target_hwnd, winfuncs.c.byref(self.target_position))
-        if not has_rect:
+        since_hwnd_change = time.time() - self.hwnd_change_timestamp
+        if self.applied_position and since_hwnd_change < GRACE_PERIOD and time.time() - self.create_timestamp > GRACE_PERIOD:
+            self.schedule_update(GRACE_PERIOD - since_hwnd_change)
             return
 
+        left, top, right, bottom = self.target_rect
         wanted_position = [
-            self.target_position.left + 6,
-            self.target_position.top - 30,
-            self.target_position.right - self.target_position.left - 12,
+            left + 6,
+            top - 30,
+            right - left - 12,
             32,
         ]
 
@@ -222,28 +378,26 @@ class RenderHeaderWindow:
             )
 
     def get_entry_index_at_pos(self, lParam):
-        if not self.entries:
+        if not self.entries or not self.applied_position:
             return None
 
         x = (lParam & 0x0000ffff)
-        y = (lParam & 0xffff0000) >> 16
-
-        width = self.applied_position[2]
-        entry_width = width // len(self.entries)
-
-        return min(x // entry_width, len(self.entries)-1)
+        return header_layout.get_entry_index_at(x, self.applied_position[2], len(self.entries))
 
     def handle_message(self, message, wParam, lParam):
         if message == win32con.WM_DESTROY:
             self.close()
             return 0
         elif message == win32con.WM_PAINT:
-            if self.repaint or time.time() > self.last_paint + 1.0:
-                self.paint()
+            self.paint()
             return 0
         elif message == win32con.WM_SIZE or message == win32con.WM_MOVE:
             self.repaint = True
             return 0
+        elif message == win32con.WM_TIMER:
+            c.windll.user32.KillTimer(self.hwnd, GRACE_TIMER_ID)
+            self.update()
+            return 0
         elif message == win32con.WM_LBUTTONUP:
             entry = self.get_entry_index_at_pos(lParam)
             if entry is not None:
@@ -266,14 +420,29 @@ class RenderHeaderWindow:
             return
         self.closed = True
         winfuncs.DestroyWindow(self.hwnd)
+        self.free_buffer()
 
         del RenderState.Headers[self.header_id]
+        RenderState.HeadersByHwnd.pop(self.hwnd, None)
+
+def post_command(cmd):
+    """ Queue a command for the renderer and wake it up if it's waiting for messages. """
+    CommandQueue.put(cmd)
+    if RenderState.ThreadId is not None:
+        c.windll.user32.PostThreadMessageW(RenderState.ThreadId, WM_PYLEWM_COMMAND, 0, 0)
 
-def update_headers():
-    for id, header in RenderState.Headers.items():
-        header.update()
+def handle_queued_commands():
+    while RenderState.Running:
+        try:
+            cmd = CommandQueue.get(block=False)
+        except queue.Empty:
+            return
+        handle_command(cmd)
 
 def handle_command(cmd):
+    if isinstance(cmd, bytes):
+        cmd = pickle.loads(cmd)
+
     if cmd[0] == "create":
         header_id = cmd[1]
         target_hwnd = cmd[2]
@@ -286,40 +455,76 @@ def handle_command(cmd):
         state = cmd[4]
         if header_id in RenderState.Headers:
             RenderState.Headers[header_id].set(target_hwnd, entries, state)
+    elif cmd[0] == "delta":
+        header_id = cmd[1]
+        target_hwnd = cmd[2]
+        entry_count = cmd[3]
+        changed = cmd[4]
+        state = cmd[5]
+        if header_id in RenderState.Headers:
+            RenderState.Headers[header_id].set_delta(target_hwnd, entry_count, changed, state)
+    elif cmd[0] == "target":
+        header_id = cmd[1]
+        if header_id in RenderState.Headers:
+            RenderState.Headers[header_id].set_target(cmd[2], cmd[3], cmd[4])
     elif cmd[0] == "close":
         header_id = cmd[1]
         if header_id in RenderState.Headers:
             RenderState.Headers[header_id].close()
+    elif cmd[0] == "quit":
+        RenderState.Running = False
 
 def run():
     RenderState.Running = True
     faulthandler.enable()
 
+    # Make sure our thread has a message queue before anyone can post to it
     message = w.MSG()
+    winfuncs.PeekMessageW(c.byref(message), None, 0, 0, winfuncs.PM_NOREMOVE)
+    RenderState.ThreadId = c.windll.kernel32.GetCurrentThreadId()
+
+    OutputQueue.put([None, "ready", winfuncs.GetCurrentWorkingSetSize()])
+
+    # Everything we need to do is triggered by either a window message or a queued command,
+    # so sleep in GetMessage until one of those comes in
     while RenderState.Running:
-        while winfuncs.PeekMessageW(c.byref(message), None, 0, 0, winfuncs.PM_REMOVE):
-            winfuncs.TranslateMessage(c.byref(message))
-            winfuncs.DispatchMessageW(c.byref(message))
+        handle_queued_commands()
+        if not RenderState.Running:
+            break
+
+        result = winfuncs.GetMessageW(c.byref(message), None, 0, 0)
+        if result == 0 or result == -1:
+            break
+        if message.hWnd is None and message.message == WM_PYLEWM_COMMAND:
+            continue
 
-        update_headers()
+        winfuncs.TranslateMessage(c.byref(message))
+        winfuncs.DispatchMessageW(c.byref(message))
 
-        cmd = None
+    RenderState.ThreadId = None
+
+def receive_commands(connection):
+    while True:
         try:
-            cmd = CommandQueue.get(block=True, timeout=1.0/60.0)
+            data = connection.recv_bytes()
         except:
-            pass
+            # The main process went away, so should we
+            post_command(["quit"])
+            return
+        post_command(data)
+
+def run_process(address, authkey):
+    from multiprocessing.connection import Client
+    command_connection = Client(address, authkey=authkey)
+    output_connection = Client(address, authkey=authkey)
 
-        if cmd:
-            handle_command(cmd)
+    global CommandQueue
+    global OutputQueue
+    CommandQueue = queue.Queue()
+    OutputQueue = ConnectionOutput(output_connection)
 
-        while CommandQueue.qsize() != 0:
-            cmd = None
-            try:
-                cmd = CommandQueue.get(block=False)
-            except:
-                pass
-            if cmd:
-                handle_command(cmd)
+    threading.Thread(target=receive_commands, args=(command_connection,), daemon=True).start()
+    run()
 
 if __name__ == "__main__":
-    run()
\ No newline at end of file
+    run_process(sys.argv[1], bytes.fromhex(sys.argv[2]))
\ No newline at end of file
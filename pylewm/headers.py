@@ -1,34 +1,108 @@
 import pylewm.commands
 import pylewm.focus
-import multiprocessing
+import pylewm.config
+import pylewm.perf
+import pylewm.helper_process
+import pylewm.winproxy.winfuncs as winfuncs
+import subprocess
+import threading
+import queue
+import pickle
 import atexit
+import time
 
 class HeaderState:
-    Process : multiprocessing.Process = None
-    CommandQueue : multiprocessing.Queue = None
-    OutputQueue : multiprocessing.Queue = None
+    Process : subprocess.Popen = None
+    Thread : threading.Thread = None
+    CommandQueue : queue.Queue = None
+    OutputQueue : queue.Queue = None
+    StartTime = 0.0
+    StartWorkingSet = 0
 
-def header_process(CommandQueue, OutputQueue):
-    import pylewm.header_renderer
-    pylewm.header_renderer.CommandQueue = CommandQueue
-    pylewm.header_renderer.OutputQueue = OutputQueue
-    pylewm.header_renderer.run()
+def send_command(cmd):
+    if HeaderState.Thread:
+        pylewm.perf.count("Header IPC messages")
+        pylewm.header_renderer.post_command(cmd)
+        return
+
+    # Pickle ourselves so we know how much data we're pushing to the header process
+    data = pickle.dumps(cmd, protocol=pickle.HIGHEST_PROTOCOL)
+    pylewm.perf.count("Header IPC messages")
+    pylewm.perf.record("Header IPC bytes", len(data))
+    HeaderState.CommandQueue.put(data)
+
+def handle_status(cmd):
+    """ Handle a status message from the renderer that isn't meant for a specific header. """
+    if cmd[0] == "ready":
+        if HeaderState.Thread:
+            mode = "thread"
+            memory = winfuncs.GetCurrentWorkingSetSize() - HeaderState.StartWorkingSet
+        else:
+            mode = "process"
+            memory = cmd[1]
+
+        pylewm.perf.record(f"Header renderer startup ({mode})", time.perf_counter() - HeaderState.StartTime)
+        pylewm.perf.record(f"Header renderer memory MB ({mode})", max(memory, 0) / (1024.0 * 1024.0))
+    elif cmd[0] == "paint":
+        pylewm.perf.record("Header paint time", cmd[1])
+        pylewm.perf.count("Header bitmap cache hits", cmd[2])
+        pylewm.perf.count("Header bitmap cache misses", cmd[3])
 
 def kill_header_process():
-    if HeaderState.Process and HeaderState.Process.is_alive():
+    if HeaderState.Process and HeaderState.Process.poll() is None:
         HeaderState.Process.kill()
+    if HeaderState.Thread:
+        pylewm.header_renderer.post_command(["quit"])
+
+def send_commands_to_process(connection):
+    while True:
+        data = HeaderState.CommandQueue.get()
+        try:
+            connection.send_bytes(data)
+        except:
+            return
+
+def receive_output_from_process(connection):
+    while True:
+        try:
+            cmd = connection.recv()
+        except:
+            return
+        HeaderState.OutputQueue.put(cmd)
+
+def accept_header_process(listener):
+    command_connection = listener.accept()
+    output_connection = listener.accept()
+    listener.close()
+
+    threading.Thread(target=receive_output_from_process, args=(output_connection,), daemon=True).start()
+    send_commands_to_process(command_connection)
+
+def start_header_process():
+    HeaderState.Process, listener = pylewm.helper_process.start_helper_process("pylewm.header_renderer")
+    threading.Thread(target=accept_header_process, args=(listener,), daemon=True).start()
+
+def start_header_thread():
+    import pylewm.header_renderer
+    pylewm.header_renderer.CommandQueue = HeaderState.CommandQueue
+    pylewm.header_renderer.OutputQueue = HeaderState.OutputQueue
+
+    HeaderState.Thread = threading.Thread(target=pylewm.header_renderer.run, daemon=True)
+    HeaderState.Thread.start()
 
 def init_header_process():
-    if HeaderState.Process:
+    if HeaderState.Process or HeaderState.Thread:
         return
 
-    HeaderState.CommandQueue = multiprocessing.Queue()
-    HeaderState.OutputQueue = multiprocessing.Queue()
-    HeaderState.Process = multiprocessing.Process(
-        target=header_process,
-        args=(HeaderState.CommandQueue, HeaderState.OutputQueue)
-    )
-    HeaderState.Process.start()
+    HeaderState.StartTime = time.perf_counter()
+    HeaderState.StartWorkingSet = winfuncs.GetCurrentWorkingSetSize()
+    HeaderState.CommandQueue = queue.Queue()
+    HeaderState.OutputQueue = queue.Queue()
+
+    if pylewm.config.HeaderRenderer == "thread" or not pylewm.helper_process.can_start_helper_process():
+        start_header_thread()
+    else:
+        start_header_process()
     atexit.register(kill_header_process)
 
 class WindowHeader:
@@ -36,9 +110,13 @@ class WindowHeader:
         self.header_id = id
         self.target_hwnd = target_hwnd
 
+        self.sent_entries = []
+        self.sent_state = None
+        self.sent_target = None
+
         init_header_process()
 
-        HeaderState.CommandQueue.put(
+        send_command(
             ["create",
                 self.header_id,
                 self.target_hwnd,
@@ -49,14 +127,38 @@ class WindowHeader:
         self.closed = False
 
     def update(self, target_hwnd, entries, state):
-        self.target_hwnd = target_hwnd
-        HeaderState.CommandQueue.put(
-            ["update", self.header_id, target_hwnd, entries, state]
+        # Only send the entries that changed since the last update
+        changed = {}
+        for index, entry in enumerate(entries):
+            if index >= len(self.sent_entries) or self.sent_entries[index] != entry:
+                changed[index] = entry
+
+        if (not changed
+                and target_hwnd == self.target_hwnd
+                and len(entries) == len(self.sent_entries)
+                and state == self.sent_state):
+            return
+
+        send_command(
+            ["delta", self.header_id, target_hwnd, len(entries), changed,
+                state if state != self.sent_state else None]
         )
 
+        self.target_hwnd = target_hwnd
+        self.sent_entries = entries
+        self.sent_state = state
+
+    def set_target(self, target_hwnd, target_rect, target_visible):
+        # The renderer doesn't poll the target window, so push changes to its geometry
+        target = (target_hwnd, target_rect, target_visible)
+        if target == self.sent_target:
+            return
+        self.sent_target = target
+        send_command(["target", self.header_id, target_hwnd, target_rect, target_visible])
+
     def close(self):
         self.closed = True
 
-        HeaderState.CommandQueue.put(
+        send_command(
             ["close", self.header_id]
-        )
\ No newline at end of file
+        )
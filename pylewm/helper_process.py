@@ -0,0 +1,34 @@
+from multiprocessing.connection import Listener
+import subprocess
+import sys
+import os
+
+def can_start_helper_process():
+    """
+        Helper processes run our modules with `python -m`, which a frozen build can't do:
+        its executable is PyleWM itself, and would ignore the module and start a second window manager.
+    """
+    return not getattr(sys, "frozen", False)
+
+def start_helper_process(module_name):
+    """
+        Start a small python process running one of our modules as __main__.
+        Returns the process and a listener that the process will connect to.
+    """
+    if not can_start_helper_process():
+        raise RuntimeError(f"Can't start {module_name} as a helper process from a frozen build")
+
+    authkey = os.urandom(32)
+    listener = Listener(authkey=authkey)
+
+    # The child only imports what it needs, pylewm/__init__ skips everything else when this is set
+    package_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ)
+    env["PYLEWM_HELPER_PROCESS"] = "1"
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [package_root, env.get("PYTHONPATH")]))
+
+    process = subprocess.Popen(
+        [sys.executable, "-m", module_name, listener.address, authkey.hex()],
+        env=env,
+    )
+    return process, listener
@@ -1,4 +1,5 @@
 import pylewm.commands
+import pylewm.perf
 import sys, ctypes
 from ctypes import windll, CFUNCTYPE, POINTER, c_int, c_uint, c_void_p, byref, c_ulong, pointer, addressof, create_string_buffer
 import win32con, win32gui, atexit
@@ -6,13 +7,31 @@ import ctypes.wintypes as wintypes
 import pylewm.winproxy.winfuncs as winfuncs
 
 import traceback, threading
+import itertools
 import copy
 import time
 
+MOUSE_BUTTON_MESSAGES = frozenset((
+    win32con.WM_LBUTTONDOWN, win32con.WM_LBUTTONUP,
+    win32con.WM_RBUTTONDOWN, win32con.WM_RBUTTONUP,
+    win32con.WM_MBUTTONDOWN, win32con.WM_MBUTTONUP,
+))
+
 class MouseState:
     LEFT_MOUSE_DOWN = False
     RIGHT_MOUSE_DOWN = False
     MOUSE_HOOKS = []
+    # Mouse message type -> hooks that want to receive it
+    SUBSCRIPTIONS : dict[int, list] = {}
+
+    # Mouse moves are never sent to hooks, the latest position is stored here instead
+    # while anything is subscribed to them, and MOVE_EVENT is set when it changes
+    MOVE_SUBSCRIBERS = 0
+    LATEST_MOVE = None
+    MOVE_EVENT = threading.Event()
+
+    # Perf stat for each mouse message type, so the hook doesn't need to look them up by name
+    HOOK_STATS = {}
 
 queue_command = None
 
@@ -51,6 +70,7 @@ class Mode:
     def __call__(self):
         with ModeLock:
             ModeStack.insert(0, self)
+        push_hook_process_state()
 
 class KeyPrompt(Mode):
     def __init__(self, callback, escape_cancels=True):
@@ -81,15 +101,20 @@ def escape_mode():
         if ModeStack:
             ModeStack[0].end_mode()
             ModeStack.pop(0)
+    push_hook_process_state()
 
 @pylewm.commands.PyleCommand
 def release_all_modifiers():
     """ Synthetically release all modifiers currently being held. """
+    global ActiveModifierMask
     ActiveKey.alt.release()
     ActiveKey.win.release()
     ActiveKey.ctrl.release()
     ActiveKey.shift.release()
     ActiveKey.app.release()
+    ActiveModifierMask = 0
+    # The hook process keeps its own mask to match bindings against
+    send_to_hook_process(["reset_modifiers"])
 
 @pylewm.commands.PyleCommand
 def absorb_key():
@@ -147,6 +172,14 @@ class ModPair:
         self.either = False
         self.any_state = False
 
+    def get_matching_states(self):
+        """ Get every (left | right << 1) state of an active modifier that this binding modifier matches. """
+        if self.any_state:
+            return (0, 1, 2, 3)
+        if self.either:
+            return (1, 2, 3)
+        return (int(self.left) | int(self.right) << 1,)
+
     def copy(self):
         other = ModPair()
         other.left = self.left
@@ -218,6 +251,16 @@ class KeySpec:
             and self.ctrl == other.ctrl and self.shift == other.shift \
             and self.key == other.key and self.app == other.app
 
+    def get_matching_masks(self):
+        """ Get every active modifier bitmask that this spec's modifiers match. """
+        masks = []
+        for states in itertools.product(*(getattr(self, name).get_matching_states() for name in MODIFIER_NAMES)):
+            mask = 0
+            for index, state in enumerate(states):
+                mask |= state << (index * 2)
+            masks.append(mask)
+        return masks
+
     def copy(self):
         other = KeySpec(self.key)
         other.alt = self.alt.copy()
@@ -238,6 +281,10 @@ class KeySpec:
         return repr(self.__dict__)
             
 KeyBindings = {}
+# Compiled bindings, keyed by (vk, modifier bitmask) so a key event is a single lookup
+KeyDispatch : dict[tuple[int, int], list] = {}
+# Two bits per modifier, left and right, in the order of MODIFIER_NAMES
+ActiveModifierMask = 0
 ModeStack = []
 ModeLock = threading.RLock()
 ActiveKey = KeySpec('')
@@ -265,19 +312,48 @@ def registerSpec(keySpec, command):
         KeyBindings[keySpec.key] = []
     KeyBindings[keySpec.key].append((keySpec, command))
 
+    for vk in KEY_NAME_VKS.get(keySpec.key, ()):
+        for mask in keySpec.get_matching_masks():
+            KeyDispatch.setdefault((vk, mask), []).append(command)
+    push_hook_process_bindings()
+
+def update_modifiers(isKeyDown, keyCode):
+    global ActiveModifierMask
+    modifier = MODIFIER_VKS.get(keyCode)
+    if not modifier:
+        return 0
+
+    name, side, bit = modifier
+    pair = getattr(ActiveKey, name)
+    if side == 1:
+        pair.left = isKeyDown
+    else:
+        pair.right = isKeyDown
+
+    if isKeyDown:
+        ActiveModifierMask |= bit
+    else:
+        ActiveModifierMask &= ~bit
+    return side
+
+def dispatch_binding(isKeyDown, keyCode, modifierMask):
+    commands = KeyDispatch.get((keyCode, modifierMask))
+    if not commands:
+        return False
+
+    for command in commands:
+        if isKeyDown:
+            queue_command(command)
+        elif hasattr(command, "release_event"):
+            queue_command(command.release_event)
+    return True
+
 def handle_python(isKeyDown, keyCode, scanCode):
-    absorbKey = False
-        
     # Handle modifiers
-    isMod = 0
-    isMod |= ActiveKey.alt.update(keyCode, isKeyDown, win32con.VK_LMENU, win32con.VK_RMENU)
-    isMod |= ActiveKey.shift.update(keyCode, isKeyDown, win32con.VK_LSHIFT, win32con.VK_RSHIFT)
-    isMod |= ActiveKey.ctrl.update(keyCode, isKeyDown, win32con.VK_LCONTROL, win32con.VK_RCONTROL)
-    isMod |= ActiveKey.win.update(keyCode, isKeyDown, win32con.VK_LWIN, win32con.VK_RWIN)
-    isMod |= ActiveKey.app.update(keyCode, isKeyDown, win32con.VK_APPS, 0)
+    isMod = update_modifiers(isKeyDown, keyCode)
 
     # Update active key
-    ActiveKey.key = VKToChr(keyCode, scanCode)
+    ActiveKey.key = VK_NAMES[keyCode & 0xFF]
     ActiveKey.down = isKeyDown
 
     # Check modes
@@ -289,19 +365,70 @@ def handle_python(isKeyDown, keyCode, scanCode):
                     return handle_type
 
     # Check keybinds
-    if ActiveKey.key in KeyBindings:
-        for bnd in KeyBindings[ActiveKey.key]:
-            if bnd[0].equals_combo(ActiveKey):
-                absorbKey = True
-                if ActiveKey.down:
-                    queue_command(bnd[1])
-                elif hasattr(bnd[1], "release_event"):
-                        queue_command(bnd[1].release_event)
-
-    if keyCode == win32con.VK_F15:
+    absorbKey = dispatch_binding(isKeyDown, keyCode, ActiveModifierMask)
+
+    if keyCode in ALWAYS_ABSORB_VKS:
         return True
     return absorbKey
 
+def handle_mouse_button(wParam):
+    if wParam == win32con.WM_LBUTTONDOWN:
+        MouseState.LEFT_MOUSE_DOWN = True
+    elif wParam == win32con.WM_LBUTTONUP:
+        MouseState.LEFT_MOUSE_DOWN = False
+    elif wParam == win32con.WM_RBUTTONDOWN:
+        MouseState.RIGHT_MOUSE_DOWN = True
+    elif wParam == win32con.WM_RBUTTONUP:
+        MouseState.RIGHT_MOUSE_DOWN = False
+
+    procs = MouseState.SUBSCRIPTIONS.get(wParam)
+    if procs:
+        for proc in procs:
+            if proc(wParam):
+                return True
+    return False
+
+def add_mouse_hook(proc, messages=MOUSE_BUTTON_MESSAGES):
+    """ Call proc(wParam) from the mouse hook for the given message types, returning True absorbs the input. """
+    MouseState.MOUSE_HOOKS.append(proc)
+    for message in messages:
+        MouseState.SUBSCRIPTIONS.setdefault(message, []).append(proc)
+    push_hook_process_state()
+
+def remove_mouse_hook(proc):
+    MouseState.MOUSE_HOOKS.remove(proc)
+    for message, procs in list(MouseState.SUBSCRIPTIONS.items()):
+        if proc in procs:
+            procs.remove(proc)
+        if not procs:
+            del MouseState.SUBSCRIPTIONS[message]
+    push_hook_process_state()
+
+def subscribe_mouse_moves():
+    """ Start tracking the latest mouse position in MouseState.LATEST_MOVE. """
+    MouseState.MOVE_SUBSCRIBERS += 1
+    push_hook_process_state()
+
+def unsubscribe_mouse_moves():
+    MouseState.MOVE_SUBSCRIBERS -= 1
+    push_hook_process_state()
+
+def set_latest_mouse_move(x, y):
+    MouseState.LATEST_MOVE = (x, y)
+    MouseState.MOVE_EVENT.set()
+
+def get_mouse_hook_stat(wParam):
+    stat = MouseState.HOOK_STATS.get(wParam)
+    if stat is None:
+        stat = pylewm.perf.get_stat(f"Mouse hook time (message 0x{wParam:04x})")
+        MouseState.HOOK_STATS[wParam] = stat
+    return stat
+
+def record_input_latency(event_time):
+    # Event times are GetTickCount() milliseconds, which wrap around
+    latency = (windll.kernel32.GetTickCount() - event_time) & 0xFFFFFFFF
+    pylewm.perf.record(f"Input latency ms ({HookProcessState.Mode})", latency)
+
 # TODO: Complete this map
 VK_MAP = {
     win32con.VK_ESCAPE: "esc",
@@ -363,7 +490,123 @@ def VKToChr(vk, sc):
 
     return chr(charValue).lower()
 
+# Modifiers in the order of their bits in the modifier mask
+MODIFIER_NAMES = ("alt", "win", "ctrl", "shift", "app")
+
+def get_modifier_vks():
+    modifier_vks = {}
+    modifier_keys = (
+        (win32con.VK_LMENU, win32con.VK_RMENU),
+        (win32con.VK_LWIN, win32con.VK_RWIN),
+        (win32con.VK_LCONTROL, win32con.VK_RCONTROL),
+        (win32con.VK_LSHIFT, win32con.VK_RSHIFT),
+        (win32con.VK_APPS, 0),
+    )
+    for index, (name, (left_vk, right_vk)) in enumerate(zip(MODIFIER_NAMES, modifier_keys)):
+        modifier_vks[left_vk] = (name, 1, 1 << (index * 2))
+        if right_vk != 0:
+            modifier_vks[right_vk] = (name, 2, 1 << (index * 2 + 1))
+    return modifier_vks
+
+MODIFIER_VKS = get_modifier_vks()
+
+# Keys that never reach other applications
+ALWAYS_ABSORB_VKS = frozenset((win32con.VK_F15,))
+
+# Key names of all virtual keys, so the hook doesn't need to call MapVirtualKey
+VK_NAMES = [VKToChr(vk, 0) for vk in range(0, 256)]
+KEY_NAME_VKS = {}
+for vk, name in enumerate(VK_NAMES):
+    if name:
+        KEY_NAME_VKS.setdefault(name, []).append(vk)
+
+class HookProcessState:
+    Mode = "thread"
+    Process = None
+    ControlConnection = None
+    SendLock = threading.Lock()
+
+def send_to_hook_process(cmd):
+    connection = HookProcessState.ControlConnection
+    if not connection:
+        return
+    with HookProcessState.SendLock:
+        try:
+            connection.send(cmd)
+        except:
+            pass
+
+def push_hook_process_bindings():
+    send_to_hook_process(["bindings", frozenset(KeyDispatch.keys())])
+
+def push_hook_process_state():
+    send_to_hook_process(["state", bool(ModeStack), frozenset(MouseState.SUBSCRIPTIONS.keys()), MouseState.MOVE_SUBSCRIBERS > 0])
+
+def handle_hook_process_event(event):
+    if event[0] == "binding":
+        isKeyDown, keyCode, modifierMask, event_time = event[1:]
+        record_input_latency(event_time)
+        dispatch_binding(isKeyDown, keyCode, modifierMask)
+    elif event[0] == "modifier":
+        isKeyDown, keyCode, event_time = event[1:]
+        update_modifiers(isKeyDown, keyCode)
+    elif event[0] == "key":
+        isKeyDown, keyCode, scanCode, event_time, sequence = event[1:]
+        record_input_latency(event_time)
+        absorb = bool(handle_python(isKeyDown, keyCode, scanCode))
+        send_to_hook_process(["reply", sequence, absorb])
+    elif event[0] == "mouse":
+        wParam, sequence = event[1:]
+        start_time = time.perf_counter()
+        absorb = handle_mouse_button(wParam)
+        get_mouse_hook_stat(wParam).add(time.perf_counter() - start_time)
+        if sequence is not None:
+            send_to_hook_process(["reply", sequence, absorb])
+    elif event[0] == "move":
+        set_latest_mouse_move(event[1], event[2])
+
+def kill_hook_process():
+    if HookProcessState.Process and HookProcessState.Process.poll() is None:
+        HookProcessState.Process.kill()
+
+def wait_for_hotkeys_in_process():
+    """ Let a separate process own the input hooks, so our own GIL can never stall system input. """
+    import pylewm.helper_process
+    if not pylewm.helper_process.can_start_helper_process():
+        wait_for_hotkeys()
+        return
+
+    HookProcessState.Mode = "process"
+    HookProcessState.Process, listener = pylewm.helper_process.start_helper_process("pylewm.input_hook_process")
+    atexit.register(kill_hook_process)
+
+    event_connection = listener.accept()
+    control_connection = listener.accept()
+    listener.close()
+
+    HookProcessState.ControlConnection = control_connection
+    send_to_hook_process(["config", { vk: bit for vk, (name, side, bit) in MODIFIER_VKS.items() }, ALWAYS_ABSORB_VKS])
+    push_hook_process_bindings()
+    push_hook_process_state()
+
+    while not pylewm.commands.stopped:
+        try:
+            event = event_connection.recv()
+        except:
+            break
+        handle_hook_process_event(event)
+
+    HookProcessState.ControlConnection = None
+    kill_hook_process()
+
+    # If the hook process died on its own, fall back to hooking input ourselves
+    if not pylewm.commands.stopped:
+        print("-- Input hook process stopped, hooking input in-process instead")
+        wait_for_hotkeys()
+
 def wait_for_hotkeys():
+    HookProcessState.Mode = "thread"
+
     def handle_keyboard_windows(nCode, wParam, lParam):
         if nCode < 0:
             return winfuncs.CallNextHookEx(keyboardHook, nCode, wParam, lParam)
@@ -376,28 +619,32 @@ def wait_for_hotkeys():
             isKeyUp = True
 
         keyInfo = winfuncs.CastToKbDllHookStruct(lParam)
-        
+
         shouldContinue = True
         if isKeyDown or isKeyUp:
+            record_input_latency(keyInfo.time)
+            start_time = time.perf_counter()
             shouldContinue = not handle_python(isKeyDown, keyInfo.vkCode, keyInfo.scanCode)
+            pylewm.perf.record_since("Keyboard hook time", start_time)
         if shouldContinue:
             return winfuncs.CallNextHookEx(keyboardHook, nCode, wParam, lParam)
         return 1
 
     def handle_mouse_windows(nCode, wParam, lParam):
-        if wParam == win32con.WM_LBUTTONDOWN:
-            MouseState.LEFT_MOUSE_DOWN = True
-        elif wParam == win32con.WM_LBUTTONUP:
-            MouseState.LEFT_MOUSE_DOWN = False
-        elif wParam == win32con.WM_RBUTTONDOWN:
-            MouseState.RIGHT_MOUSE_DOWN = True
-        elif wParam == win32con.WM_RBUTTONUP:
-            MouseState.RIGHT_MOUSE_DOWN = False
-
-        for proc in MouseState.MOUSE_HOOKS:
-            if proc(wParam):
+        # Message types nobody subscribed to go straight on, only the paths that do work are timed
+        if wParam == win32con.WM_MOUSEMOVE:
+            # Moves are coalesced into a single slot instead of calling any hooks
+            if MouseState.MOVE_SUBSCRIBERS > 0:
+                start_time = time.perf_counter()
+                mouseInfo = winfuncs.CastToMsLlHookStruct(lParam)
+                set_latest_mouse_move(mouseInfo.pt.x, mouseInfo.pt.y)
+                get_mouse_hook_stat(wParam).add(time.perf_counter() - start_time)
+        elif wParam in MOUSE_BUTTON_MESSAGES or wParam in MouseState.SUBSCRIPTIONS:
+            start_time = time.perf_counter()
+            absorb = handle_mouse_button(wParam)
+            get_mouse_hook_stat(wParam).add(time.perf_counter() - start_time)
+            if absorb:
                 return 1
-
         return winfuncs.CallNextHookEx(mouseHook, nCode, wParam, lParam)
 
     modulePtr = winfuncs.GetModuleHandleW(None)
@@ -0,0 +1,178 @@
+import pylewm.winproxy.winfuncs as winfuncs
+import ctypes as c
+import threading
+import queue
+import sys
+
+from multiprocessing.connection import Client
+
+WH_KEYBOARD_LL = 13
+WH_MOUSE_LL = 14
+
+WM_KEYDOWN = 0x0100
+WM_KEYUP = 0x0101
+WM_SYSKEYDOWN = 0x0104
+WM_SYSKEYUP = 0x0105
+WM_MOUSEMOVE = 0x0200
+
+MOUSE_BUTTON_MESSAGES = frozenset((
+    0x0201, 0x0202, # WM_LBUTTONDOWN, WM_LBUTTONUP
+    0x0204, 0x0205, # WM_RBUTTONDOWN, WM_RBUTTONUP
+    0x0207, 0x0208, # WM_MBUTTONDOWN, WM_MBUTTONUP
+))
+
+class HookState:
+    # Pushed to us by the main process
+    Bindings : frozenset = frozenset()
+    ModifierBits : dict[int, int] = {}
+    AlwaysAbsorb : frozenset = frozenset()
+    ModeActive = False
+    MouseSubscriptions : frozenset = frozenset()
+    MoveSubscribed = False
+
+    # Latest mouse position that hasn't been sent yet, moves are coalesced into this
+    LatestMove = None
+    MoveEvent = threading.Event()
+
+    ModifierMask = 0
+    NextSequence = 0
+    EventConnection = None
+    SendLock = threading.Lock()
+    Replies : queue.Queue = queue.Queue()
+
+    # How long we wait for the main process to decide whether to absorb an input,
+    # if it takes longer than this the input passes through to keep the hook alive
+    ReplyTimeout = 0.15
+
+def send_event(event):
+    with HookState.SendLock:
+        HookState.EventConnection.send(event)
+
+def ask_main_process(event):
+    HookState.NextSequence += 1
+    sequence = HookState.NextSequence
+    send_event([*event, sequence])
+
+    while True:
+        try:
+            reply_sequence, absorb = HookState.Replies.get(timeout=HookState.ReplyTimeout)
+        except queue.Empty:
+            return False
+        # Replies to events that already timed out are dropped
+        if reply_sequence == sequence:
+            return absorb
+
+def handle_keyboard(nCode, wParam, lParam):
+    if nCode < 0:
+        return winfuncs.CallNextHookEx(None, nCode, wParam, lParam)
+
+    if wParam == WM_KEYDOWN or wParam == WM_SYSKEYDOWN:
+        isKeyDown = True
+    elif wParam == WM_KEYUP or wParam == WM_SYSKEYUP:
+        isKeyDown = False
+    else:
+        return winfuncs.CallNextHookEx(None, nCode, wParam, lParam)
+
+    keyInfo = winfuncs.CastToKbDllHookStruct(lParam)
+    vk = keyInfo.vkCode
+
+    modifier_bit = HookState.ModifierBits.get(vk)
+    if modifier_bit:
+        if isKeyDown:
+            HookState.ModifierMask |= modifier_bit
+        else:
+            HookState.ModifierMask &= ~modifier_bit
+
+    if HookState.ModeActive:
+        # Modes run arbitrary python to decide what to do with keys, so they have to be asked
+        absorb = ask_main_process(["key", isKeyDown, vk, keyInfo.scanCode, keyInfo.time])
+    else:
+        if modifier_bit:
+            send_event(["modifier", isKeyDown, vk, keyInfo.time])
+
+        absorb = False
+        if (vk, HookState.ModifierMask) in HookState.Bindings:
+            send_event(["binding", isKeyDown, vk, HookState.ModifierMask, keyInfo.time])
+            absorb = True
+        if vk in HookState.AlwaysAbsorb:
+            absorb = True
+
+    if absorb:
+        return 1
+    return winfuncs.CallNextHookEx(None, nCode, wParam, lParam)
+
+def handle_mouse(nCode, wParam, lParam):
+    if nCode < 0:
+        pass
+    elif wParam == WM_MOUSEMOVE:
+        if HookState.MoveSubscribed:
+            mouseInfo = winfuncs.CastToMsLlHookStruct(lParam)
+            HookState.LatestMove = (mouseInfo.pt.x, mouseInfo.pt.y)
+            HookState.MoveEvent.set()
+    elif wParam in HookState.MouseSubscriptions:
+        if ask_main_process(["mouse", wParam]):
+            return 1
+    elif wParam in MOUSE_BUTTON_MESSAGES:
+        send_event(["mouse", wParam, None])
+    return winfuncs.CallNextHookEx(None, nCode, wParam, lParam)
+
+def send_mouse_moves():
+    # Only the latest position is sent, however many moves happened while we were sending the last one
+    while True:
+        HookState.MoveEvent.wait()
+        HookState.MoveEvent.clear()
+        position = HookState.LatestMove
+        if position is not None:
+            send_event(["move", position[0], position[1]])
+
+def receive_control(connection, thread_id):
+    while True:
+        try:
+            cmd = connection.recv()
+        except:
+            break
+
+        if cmd[0] == "reply":
+            HookState.Replies.put((cmd[1], cmd[2]))
+        elif cmd[0] == "config":
+            HookState.ModifierBits = cmd[1]
+            HookState.AlwaysAbsorb = cmd[2]
+        elif cmd[0] == "bindings":
+            HookState.Bindings = cmd[1]
+        elif cmd[0] == "state":
+            HookState.ModeActive = cmd[1]
+            HookState.MouseSubscriptions = cmd[2]
+            HookState.MoveSubscribed = cmd[3]
+        elif cmd[0] == "reset_modifiers":
+            HookState.ModifierMask = 0
+
+    # The main process went away, stop the message loop so the hooks are released
+    c.windll.user32.PostThreadMessageW(thread_id, 0x0012, 0, 0) # WM_QUIT
+
+def run_process(address, authkey):
+    HookState.EventConnection = Client(address, authkey=authkey)
+    control_connection = Client(address, authkey=authkey)
+
+    thread_id = c.windll.kernel32.GetCurrentThreadId()
+    threading.Thread(target=receive_control, args=(control_connection, thread_id), daemon=True).start()
+    threading.Thread(target=send_mouse_moves, daemon=True).start()
+
+    module_handle = winfuncs.GetModuleHandleW(None)
+    keyboard_proc = winfuncs.HOOKPROC(handle_keyboard)
+    keyboard_hook = winfuncs.SetWindowsHookExW(WH_KEYBOARD_LL, keyboard_proc, module_handle, 0)
+    mouse_proc = winfuncs.HOOKPROC(handle_mouse)
+    mouse_hook = winfuncs.SetWindowsHookExW(WH_MOUSE_LL, mouse_proc, module_handle, 0)
+
+    message = winfuncs.w.MSG()
+    while True:
+        result = winfuncs.GetMessageW(c.byref(message), None, 0, 0)
+        if result == -1 or result == 0:
+            break
+        winfuncs.TranslateMessage(c.byref(message))
+        winfuncs.DispatchMessageW(c.byref(message))
+
+    winfuncs.UnhookWindowsHookEx(keyboard_hook)
+    winfuncs.UnhookWindowsHookEx(mouse_hook)
+
+if __name__ == "__main__":
+    run_process(sys.argv[1], bytes.fromhex(sys.argv[2]))
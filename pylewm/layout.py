@@ -8,6 +8,7 @@ class Layout:
         self.pending_drop_slot = None
         self.focus = None
         self.focus_mru = []
+        self.space_visible = True
 
     def get_last_focus(self):
         if self.focus_mru:
@@ -17,6 +18,9 @@ class Layout:
     def update_layout(self):
         pass
 
+    def refresh_layout(self):
+        pass
+
     def add_window(self, window, at_slot=None, insert_direction=None):
         pass
 
@@ -44,5 +48,9 @@ class Layout:
     def takeover_from_windows(self, window_list):
         return False
 
+    def is_window_parked(self, window):
+        """ Whether the layout is keeping this window hidden while its space is visible. """
+        return False
+
     def set_pending_drop_slot(self, pending_slot):
         self.pending_drop_slot = pending_slot
\ No newline at end of file
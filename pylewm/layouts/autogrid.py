@@ -6,12 +6,66 @@ from pylewm.layouts.sidebar import SidebarLayout
 
 import math
 
+def solve_splits(start, length, limits):
+    """
+        Divide a length into evenly sized parts while respecting per-part (min, max) limits.
+        A limit of 0 means that side is unconstrained. Returns the split positions.
+    """
+    mins = [min_size for min_size, max_size in limits]
+    maxs = [max(max_size, min_size) if max_size else math.inf for min_size, max_size in limits]
+
+    min_total = sum(mins)
+    if min_total >= length:
+        # Minimum sizes can't all fit, shrink everything proportionally so we stay on screen
+        if min_total > 0:
+            sizes = [size * length / min_total for size in mins]
+        else:
+            sizes = [length / len(limits)] * len(limits)
+    elif sum(maxs) <= length:
+        # Every part is capped, the space they can't use is left over at the end
+        sizes = maxs
+    else:
+        # Raise a common level from the bottom, parts join in at their minimum and drop out at their maximum.
+        # The total size at a level is fixed_size + level * free_count until the next part joins or drops out.
+        events = []
+        for i in range(len(limits)):
+            events.append((mins[i], 0, i))
+            if maxs[i] != math.inf:
+                events.append((maxs[i], 1, i))
+        events.sort()
+
+        fixed_size = min_total
+        free_count = 0
+        level = None
+        for value, is_max, i in events:
+            if free_count and fixed_size + free_count * value >= length:
+                level = (length - fixed_size) / free_count
+                break
+            if is_max:
+                fixed_size += maxs[i]
+                free_count -= 1
+            else:
+                fixed_size -= mins[i]
+                free_count += 1
+        if level is None:
+            level = (length - fixed_size) / free_count
+
+        sizes = [min(max(level, mins[i]), maxs[i]) for i in range(len(limits))]
+
+    splits = [start]
+    position = float(start)
+    for size in sizes:
+        position += size
+        splits.append(int(round(position)))
+    return splits
+
 class AutoGridLayout(Layout):
     def __init__(self):
         Layout.__init__(self)
         self.columns : list[list[Window]] = []
         self.windows : list[Window] = []
         self.need_reposition = False
+        self.split_cache = {}
     
     def is_portrait_mode(self):
         return self.rect.width < self.rect.height
@@ -380,7 +434,7 @@ class AutoGridLayout(Layout):
         if column_count == 0:
             return None, False
 
-        column_splits = self.get_column_splits(len(self.columns))
+        column_splits = self.get_column_splits(len(self.columns), [self.get_column_limits(column) for column in self.columns])
         for column_index in range(0, column_count):
             # Check if the position is within this column
             if position[0] < column_splits[column_index]:
@@ -415,7 +469,7 @@ class AutoGridLayout(Layout):
             if not is_force_drop and column_require_force:
                 continue
 
-            slot_splits = self.get_slot_splits(slot_count + 1)
+            slot_splits = self.get_slot_splits(slot_count + 1, self.get_slot_limits(self.columns[column_index], slot_count))
             for slot_index in range(0, slot_count+1):
                 slot_start = slot_splits[slot_index]
                 slot_end = slot_splits[slot_index+1]
@@ -441,7 +495,10 @@ class AutoGridLayout(Layout):
             return self.columns[window_column+1][0]
         return None
 
-    def get_column_splits(self, column_count):
+    def get_column_splits(self, column_count, limits=None):
+        if limits and any(limit != (0, 0) for limit in limits):
+            return self.get_constrained_splits(self.rect.left, self.rect.width, limits)
+
         column_width = int(float(self.rect.width) / float(column_count))
         column_splits = []
         for i in range(0, column_count):
@@ -449,7 +506,10 @@ class AutoGridLayout(Layout):
         column_splits.append(self.rect.right)
         return column_splits
 
-    def get_slot_splits(self, slot_count):
+    def get_slot_splits(self, slot_count, limits=None):
+        if limits and any(limit != (0, 0) for limit in limits):
+            return self.get_constrained_splits(self.rect.top, self.rect.height, limits)
+
         slot_height = int(float(self.rect.height) / float(slot_count))
         slot_splits = []
         for i in range(0, slot_count):
@@ -457,6 +517,39 @@ class AutoGridLayout(Layout):
         slot_splits.append(self.rect.bottom)
         return slot_splits
 
+    def get_constrained_splits(self, start, length, limits):
+        key = (start, length, tuple(limits))
+        splits = self.split_cache.get(key)
+        if splits is None:
+            if len(self.split_cache) > 256:
+                self.split_cache.clear()
+            splits = solve_splits(start, length, limits)
+            self.split_cache[key] = splits
+        return splits
+
+    def get_column_limits(self, column):
+        """ A column is as wide as its widest minimum, and as narrow as its narrowest maximum. """
+        min_width = 0
+        max_width = 0
+        for window in column:
+            min_size, max_size = window.get_layout_limits()
+            min_width = max(min_width, min_size[0])
+            if max_size[0] and (not max_width or max_size[0] < max_width):
+                max_width = max_size[0]
+        if max_width and max_width < min_width:
+            max_width = min_width
+        return (min_width, max_width)
+
+    def get_slot_limits(self, column, extra_slot=-1):
+        """ Height limits of every window in a column, with an unconstrained slot for a window about to be dropped in. """
+        slot_limits = []
+        for window in column:
+            min_size, max_size = window.get_layout_limits()
+            slot_limits.append((min_size[1], max_size[1]))
+        if extra_slot != -1:
+            slot_limits.insert(min(extra_slot, len(slot_limits)), (0, 0))
+        return slot_limits
+
     def refresh_layout(self):
         self.need_reposition = True
 
@@ -482,7 +575,11 @@ class AutoGridLayout(Layout):
             elif self.pending_drop_slot is not None:
                 pending_column, pending_slot = self.pending_drop_slot
 
-            column_splits = self.get_column_splits(column_count)
+            column_limits = [self.get_column_limits(column) for column in self.columns]
+            if extra_column != -1:
+                column_limits.insert(extra_column, (0, 0))
+
+            column_splits = self.get_column_splits(column_count, column_limits)
             for column_index, column in enumerate(self.columns):
                 column_position = column_index
                 if extra_column != -1 and column_index >= extra_column:
@@ -492,7 +589,7 @@ class AutoGridLayout(Layout):
                 if pending_column == column_index:
                     slot_count += 1
 
-                slot_splits = self.get_slot_splits(slot_count)
+                slot_splits = self.get_slot_splits(slot_count, self.get_slot_limits(column, pending_slot if pending_column == column_index else -1))
                 for slot_index, window in enumerate(column):
                     slot_position = slot_index
                     if pending_column == column_index and slot_index >= pending_slot:
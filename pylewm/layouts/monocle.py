@@ -0,0 +1,101 @@
+from pylewm.layout import Layout
+from pylewm.rects import Direction
+from pylewm.window import Window
+
+class MonocleLayout(Layout):
+    def __init__(self):
+        Layout.__init__(self)
+        self.windows : list[Window] = []
+        self.need_reposition = False
+
+    def normalize_drop_slot(self, slot):
+        """
+            Turn a drop slot into an index into the window list, or None to fall back to appending.
+            Slots from other layouts can show up here when the layout is switched during a drag.
+        """
+        if slot == Direction.InsertLeft:
+            return 0
+        elif slot == Direction.InsertRight:
+            return len(self.windows)
+        elif isinstance(slot, tuple) and len(slot) == 1:
+            return max(0, min(slot[0], len(self.windows)))
+        return None
+
+    def add_window(self, window, at_slot=None, insert_direction=None):
+        at_slot = self.normalize_drop_slot(at_slot)
+        if at_slot is not None:
+            self.windows.insert(at_slot, window)
+        elif self.focus in self.windows:
+            self.windows.insert(self.windows.index(self.focus) + 1, window)
+        else:
+            self.windows.append(window)
+        self.need_reposition = True
+
+    def remove_window(self, window):
+        self.windows.remove(window)
+
+    def replace_window(self, old_window, new_window):
+        index = self.windows.index(old_window)
+        self.windows[index] = new_window
+        self.need_reposition = True
+
+    def get_window_in_direction(self, from_window, direction):
+        if not self.windows:
+            return None, direction
+
+        if not from_window:
+            if self.focus_mru:
+                return self.focus_mru[-1], direction
+            return self.windows[0], direction
+
+        # Only cycling stays inside the space, other directions escape to other monitors
+        index = self.windows.index(from_window)
+        if direction == Direction.Next:
+            return self.windows[(index + 1) % len(self.windows)], direction
+        elif direction == Direction.Previous:
+            return self.windows[(index - 1) % len(self.windows)], direction
+        return None, direction
+
+    def move_window_in_direction(self, window, direction):
+        index = self.windows.index(window)
+        if direction == Direction.Next:
+            new_index = (index + 1) % len(self.windows)
+        elif direction == Direction.Previous:
+            new_index = (index - 1) % len(self.windows)
+        else:
+            return False, direction
+
+        self.windows[index] = self.windows[new_index]
+        self.windows[new_index] = window
+        return True, direction
+
+    def get_drop_slot(self, position, rect):
+        return (len(self.windows),), (position[1] < self.rect.top + 100)
+
+    def get_focus_window_after_removing(self, window_before_remove):
+        if len(self.windows) < 2:
+            return None
+        index = self.windows.index(window_before_remove)
+        return self.windows[(index + 1) % len(self.windows)]
+
+    def refresh_layout(self):
+        self.need_reposition = True
+
+    def update_layout(self):
+        if not self.windows:
+            return
+
+        # Every window shares the same rect, so this only does anything
+        # when windows are added or the space changes size.
+        if self.need_reposition:
+            self.need_reposition = False
+            for window in self.windows:
+                window.set_layout(self.rect, True, (True, True, True, True))
+
+        # Switching windows is purely a z-order change, and the focus change that
+        # got us here already brings the window to the front when it activates it
+
+    def takeover_from_windows(self, window_list):
+        self.windows = list(window_list)
+        self.need_reposition = True
+        return True
@@ -0,0 +1,405 @@
+from pylewm.layout import Layout
+from pylewm.rects import Rect, Direction
+from pylewm.window import Window
+
+class ScrollingLayout(Layout):
+    """
+        Columns of full-size windows in a horizontal strip that scrolls through the monitor.
+        Only the columns in the viewport are shown, the neighbor on each side is positioned
+        ahead of time but kept hidden, and every other column stays parked where it was.
+    """
+
+    def __init__(self, visible_columns=2):
+        Layout.__init__(self)
+        self.columns : list[list[Window]] = []
+        self.windows : list[Window] = []
+        self.visible_columns = visible_columns
+        self.viewport = 0
+        self.need_reposition = False
+        self.scrolled_for_focus = None
+
+        # Windows that are currently on screen or pre-positioned next to it
+        self.placed : set[Window] = set()
+        # Windows that we've hidden because they are outside the viewport
+        self.parked : set[Window] = set()
+
+    def get_window_column(self, window):
+        for column_index, column in enumerate(self.columns):
+            if window in column:
+                return column_index, column.index(window)
+        return -1, -1
+
+    def get_mru_window_in_column(self, column_index):
+        column = self.columns[column_index]
+        for window in reversed(self.focus_mru):
+            if window in column:
+                return window
+        return column[0]
+
+    def get_shown_column_count(self):
+        return min(self.visible_columns, len(self.columns))
+
+    def scroll_to_column(self, column_index):
+        shown_count = self.get_shown_column_count()
+        viewport = self.viewport
+        if column_index < viewport:
+            viewport = column_index
+        elif column_index >= viewport + shown_count:
+            viewport = column_index - shown_count + 1
+        viewport = max(0, min(viewport, len(self.columns) - shown_count))
+
+        if viewport != self.viewport:
+            self.viewport = viewport
+            self.need_reposition = True
+
+    def is_window_parked(self, window):
+        return window in self.parked
+
+    def park_window(self, window):
+        if window in self.parked:
+            return
+        self.parked.add(window)
+        window.hide()
+
+    def unpark_window(self, window):
+        if window not in self.parked:
+            return
+        self.parked.remove(window)
+        # A hidden space will show all unparked windows when it becomes visible
+        if self.space_visible:
+            window.show()
+
+    def normalize_drop_slot(self, slot):
+        """
+            Turn a drop slot into (column_index, slot_index), where a slot_index of None means a new column.
+            Slots from other layouts can show up here when the layout is switched during a drag.
+        """
+        if slot is None:
+            return None
+        if slot == Direction.InsertLeft:
+            return (self.viewport, None)
+        elif slot == Direction.InsertRight:
+            return (min(self.viewport + self.get_shown_column_count(), len(self.columns)), None)
+        elif isinstance(slot, tuple):
+            if len(slot) == 1:
+                return (max(0, min(slot[0], len(self.columns))), None)
+
+            # A (column, slot) pair stacks the window into an existing column
+            column_index, slot_index = slot
+            if column_index < 0 or column_index >= len(self.columns):
+                return None
+            column = self.columns[column_index]
+            if slot_index == -1 or slot_index > len(column):
+                slot_index = len(column)
+            return (column_index, slot_index)
+        return (max(0, min(slot, len(self.columns))), None)
+
+    def add_window(self, window, at_slot=None, insert_direction=None):
+        self.windows.append(window)
+        self.placed.add(window)
+        self.need_reposition = True
+
+        drop_slot = self.normalize_drop_slot(at_slot)
+        if drop_slot is not None and drop_slot[1] is not None:
+            column_index, slot_index = drop_slot
+            self.columns[column_index].insert(slot_index, window)
+            self.scroll_to_column(column_index)
+            return
+
+        if drop_slot is not None:
+            insert_column = drop_slot[0]
+        elif insert_direction in Direction.ANY_Right:
+            insert_column = 0
+        elif insert_direction in Direction.ANY_Left:
+            insert_column = len(self.columns)
+        elif self.focus:
+            # New windows open in a new column right after the focused one
+            focus_column, focus_slot = self.get_window_column(self.focus)
+            insert_column = focus_column + 1
+        else:
+            insert_column = len(self.columns)
+
+        self.columns.insert(insert_column, [window])
+        if insert_column < self.viewport:
+            self.viewport += 1
+
+        self.scroll_to_column(insert_column)
+
+    def remove_window(self, window):
+        self.windows.remove(window)
+        self.placed.discard(window)
+        # A parked window stays hidden, the space it moves to shows it if it is visible
+        self.parked.discard(window)
+
+        column_index, slot_index = self.get_window_column(window)
+        if column_index != -1:
+            self.columns[column_index].remove(window)
+            if not self.columns[column_index]:
+                del self.columns[column_index]
+                if column_index < self.viewport:
+                    self.viewport -= 1
+
+        self.viewport = max(0, min(self.viewport, len(self.columns) - self.get_shown_column_count()))
+        if self.scrolled_for_focus is window:
+            self.scrolled_for_focus = None
+        self.need_reposition = True
+
+    def replace_window(self, old_window, new_window):
+        index = self.windows.index(old_window)
+        self.windows[index] = new_window
+
+        column_index, slot_index = self.get_window_column(old_window)
+        self.columns[column_index][slot_index] = new_window
+
+        if old_window in self.placed:
+            self.placed.remove(old_window)
+            self.placed.add(new_window)
+        if old_window in self.parked:
+            self.parked.remove(old_window)
+            self.parked.add(new_window)
+
+        self.need_reposition = True
+
+    def get_window_in_direction(self, from_window, direction):
+        if not self.columns:
+            return None, direction
+
+        if not from_window:
+            shown_count = self.get_shown_column_count()
+            if direction in Direction.ANY_Right:
+                return self.get_mru_window_in_column(self.viewport), direction
+            elif direction in Direction.ANY_Left:
+                return self.get_mru_window_in_column(self.viewport + shown_count - 1), direction
+            elif self.focus_mru:
+                return self.focus_mru[-1], direction
+            return self.get_mru_window_in_column(self.viewport), direction
+
+        column_index, slot_index = self.get_window_column(from_window)
+        column = self.columns[column_index]
+
+        if direction in Direction.ANY_Left:
+            if column_index == 0:
+                return None, direction
+            return self.get_mru_window_in_column(column_index-1), direction
+        elif direction in Direction.ANY_Right:
+            if column_index == len(self.columns)-1:
+                return None, direction
+            return self.get_mru_window_in_column(column_index+1), direction
+        elif direction == Direction.Next:
+            return column[(slot_index + 1) % len(column)], direction
+        elif direction == Direction.Previous:
+            return column[(slot_index - 1) % len(column)], direction
+        elif direction == Direction.Down:
+            if slot_index+1 < len(column):
+                return column[slot_index+1], direction
+        elif direction == Direction.Up:
+            if slot_index > 0:
+                return column[slot_index-1], direction
+
+        return None, direction
+
+    def move_window_in_direction(self, window, direction):
+        column_index, slot_index = self.get_window_column(window)
+        column = self.columns[column_index]
+        self.need_reposition = True
+
+        if direction in (Direction.Left, Direction.Right):
+            target_index = column_index - 1 if direction == Direction.Left else column_index + 1
+            if len(column) > 1:
+                # Split the window off into its own column on that side
+                column.remove(window)
+                if direction == Direction.Left:
+                    self.columns.insert(column_index, [window])
+                else:
+                    self.columns.insert(column_index+1, [window])
+                new_column, new_slot = self.get_window_column(window)
+                self.scroll_to_column(new_column)
+                return True, direction
+            if target_index < 0 or target_index >= len(self.columns):
+                return False, direction
+
+            # Swap the whole column with its neighbor
+            self.columns[column_index] = self.columns[target_index]
+            self.columns[target_index] = column
+            self.scroll_to_column(target_index)
+            return True, direction
+        elif direction in (Direction.InsertLeft, Direction.InsertRight):
+            target_index = column_index - 1 if direction == Direction.InsertLeft else column_index + 1
+            if target_index < 0 or target_index >= len(self.columns):
+                return False, direction
+
+            # Stack the window into the neighboring column
+            column.remove(window)
+            self.columns[target_index].append(window)
+            if not column:
+                del self.columns[column_index]
+            new_column, new_slot = self.get_window_column(window)
+            self.scroll_to_column(new_column)
+            return True, direction
+        elif direction in (Direction.Next, Direction.Previous, Direction.Up, Direction.Down):
+            if direction == Direction.Next:
+                new_slot = (slot_index + 1) % len(column)
+            elif direction == Direction.Previous:
+                new_slot = (slot_index - 1) % len(column)
+            elif direction == Direction.Down:
+                new_slot = slot_index + 1
+            else:
+                new_slot = slot_index - 1
+
+            if new_slot < 0 or new_slot >= len(column):
+                return False, direction
+
+            column[slot_index] = column[new_slot]
+            column[new_slot] = window
+            return True, direction
+
+        return False, direction
+
+    def get_column_rects(self, shown_count=None):
+        if shown_count is None:
+            shown_count = self.get_shown_column_count()
+        column_width = int(float(self.rect.width) / float(shown_count))
+        rects = []
+        for i in range(0, shown_count):
+            right = self.rect.left + column_width * (i+1)
+            if i == shown_count-1:
+                right = self.rect.right
+            rects.append(Rect((self.rect.left + column_width * i, self.rect.top, right, self.rect.bottom)))
+        return rects
+
+    def place_column(self, column, column_rect, is_first, is_last, gap_slot=-1):
+        slot_count = len(column)
+        if gap_slot != -1:
+            slot_count += 1
+        if slot_count == 0:
+            return
+
+        slot_height = int(float(column_rect.height) / float(slot_count))
+        new_rect = Rect()
+        for slot_index, window in enumerate(column):
+            slot_position = slot_index
+            if gap_slot != -1 and slot_index >= gap_slot:
+                slot_position += 1
+
+            bottom = column_rect.top + slot_height * (slot_position+1)
+            if slot_position == slot_count-1:
+                bottom = column_rect.bottom
+
+            new_rect.coordinates = (
+                column_rect.left,
+                column_rect.top + slot_height * slot_position,
+                column_rect.right,
+                bottom,
+            )
+            edges_flush = (is_first, slot_position == 0, is_last, slot_position == slot_count-1)
+            window.set_layout(new_rect, True, edges_flush)
+
+    def get_drop_slot(self, position, rect):
+        if not self.columns:
+            return (0,), (position[1] < self.rect.top + 100)
+
+        for offset, column_rect in enumerate(self.get_column_rects()):
+            if position[0] < column_rect.left or position[0] > column_rect.right:
+                continue
+
+            # Drop into a new column before or after the one under the cursor
+            force_drop = (position[0] < column_rect.left + 100 or position[0] > column_rect.right - 100)
+            if position[0] < column_rect.center[0]:
+                return (self.viewport + offset,), force_drop
+            else:
+                return (self.viewport + offset + 1,), force_drop
+
+        return (len(self.columns),), False
+
+    def get_focus_window_after_removing(self, window_before_remove):
+        column_index, slot_index = self.get_window_column(window_before_remove)
+        if slot_index > 0:
+            return self.columns[column_index][slot_index-1]
+        elif slot_index+1 < len(self.columns[column_index]):
+            return self.columns[column_index][slot_index+1]
+        elif column_index > 0:
+            return self.columns[column_index-1][0]
+        elif column_index+1 < len(self.columns):
+            return self.columns[column_index+1][0]
+        return None
+
+    def refresh_layout(self):
+        self.need_reposition = True
+
+    def update_layout(self):
+        if not self.columns:
+            return
+
+        # Keep the focused window inside the viewport
+        if self.focus and self.focus is not self.scrolled_for_focus:
+            self.scrolled_for_focus = self.focus
+            focus_column, focus_slot = self.get_window_column(self.focus)
+            if focus_column != -1:
+                self.scroll_to_column(focus_column)
+
+        if not self.need_reposition:
+            return
+        self.need_reposition = False
+
+        # Leave room for a window that is being dragged in, either as a new column or a gap in a column
+        columns = [(column, -1) for column in self.columns]
+        viewport = self.viewport
+        drop_slot = self.normalize_drop_slot(self.pending_drop_slot)
+        if drop_slot is not None:
+            column_index, slot_index = drop_slot
+            if slot_index is None:
+                columns.insert(column_index, ([], -1))
+                if column_index < viewport:
+                    viewport += 1
+            else:
+                columns[column_index] = (columns[column_index][0], slot_index)
+
+        shown_count = min(self.visible_columns, len(columns))
+        viewport = max(0, min(viewport, len(columns) - shown_count))
+        column_rects = self.get_column_rects(shown_count)
+        last_column = len(columns)-1
+
+        new_placed = set()
+        for offset in range(0, shown_count):
+            column, gap_slot = columns[viewport + offset]
+            self.place_column(column, column_rects[offset], offset == 0, offset == shown_count-1, gap_slot)
+            for window in column:
+                self.unpark_window(window)
+                new_placed.add(window)
+
+        # Position the neighbors where they will enter the viewport, so scrolling only needs to show them
+        neighbors = []
+        if viewport > 0:
+            neighbors.append((viewport-1, column_rects[0], True, shown_count == 1))
+        if viewport + shown_count <= last_column:
+            neighbors.append((viewport + shown_count, column_rects[-1], shown_count == 1, True))
+
+        for column_index, column_rect, is_first, is_last in neighbors:
+            column, gap_slot = columns[column_index]
+            self.place_column(column, column_rect, is_first, is_last, gap_slot)
+            for window in column:
+                self.park_window(window)
+                new_placed.add(window)
+
+        # Anything that left the viewport and its neighbors is parked without moving it
+        for window in self.placed:
+            if window not in new_placed:
+                self.park_window(window)
+        self.placed = new_placed
+
+    def set_pending_drop_slot(self, pending_slot):
+        self.pending_drop_slot = pending_slot
+        self.need_reposition = True
+
+    def takeover_from_windows(self, window_list):
+        self.need_reposition = True
+        self.columns = []
+        self.windows = []
+
+        for window in sorted(window_list, key=lambda window: window.real_position.center[0]):
+            self.columns.append([window])
+            self.windows.append(window)
+            self.placed.add(window)
+
+        self.viewport = 0
+        return True
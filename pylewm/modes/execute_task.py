@@ -1,7 +1,10 @@
 import pylewm
 import pylewm.commands
+import pylewm.hotkeys
+import pylewm.perf
 import pylewm.modes.list_mode
-from pylewm.window import WindowsByProxy, WindowState
+import traceback
+import time
 
 class TaskOption(pylewm.modes.list_mode.ListOption):
     def __init__(self, name, detail, function):
@@ -12,6 +15,51 @@ class TaskOption(pylewm.modes.list_mode.ListOption):
     def confirm(self):
         pylewm.commands.Commands.queue(self.function)
 
+# Task function -> TaskOption, so static tasks are only tokenized once
+STATIC_TASK_OPTIONS = {}
+
+def get_static_task_option(task_function):
+    option = STATIC_TASK_OPTIONS.get(task_function)
+    if option is None:
+        option = TaskOption(task_function.task_name, task_function.task_detail, task_function)
+        option.prepare_filter()
+        STATIC_TASK_OPTIONS[task_function] = option
+    return option
+
+# TaskGenerator -> (tasks, options), so cached tasks are only tokenized once as well
+GENERATED_TASK_OPTIONS = {}
+
+def get_generated_task_options(task_generator, tasks):
+    cached = GENERATED_TASK_OPTIONS.get(task_generator)
+    if cached is not None and cached[0] is tasks:
+        return cached[1]
+
+    options = [TaskOption(task.task_name, task.task_detail, task) for task in tasks]
+    for option in options:
+        option.prepare_filter()
+    GENERATED_TASK_OPTIONS[task_generator] = (tasks, options)
+    return options
+
+@pylewm.commands.PyleInit
+def prepare_static_tasks():
+    for task_function in pylewm.commands.STATIC_TASKS:
+        get_static_task_option(task_function)
+
+def run_task_generator(task_generator, mode):
+    start_time = time.perf_counter()
+    try:
+        tasks = task_generator.generate()
+    except Exception:
+        traceback.print_exc()
+        return
+    pylewm.perf.record_since(f"Task generator time ({task_generator.name})", start_time)
+
+    options = get_generated_task_options(task_generator, tasks)
+    with pylewm.hotkeys.ModeLock:
+        # Escaping out of the mode doesn't mark it closed, it is only gone from the stack
+        if not mode.closed and mode in pylewm.hotkeys.ModeStack:
+            mode.add_options(options)
+
 @pylewm.commands.PyleCommand
 def start_execute_task(hotkeys = {}):
     options = []
@@ -20,12 +68,22 @@ def start_execute_task(hotkeys = {}):
         if task_function.task_condition:
             if not task_function.task_condition():
                 continue
-        options.append(TaskOption(task_function.task_name, task_function.task_detail, task_function))
+        options.append(get_static_task_option(task_function))
 
+    # Generators that aren't cached run in the background and add their tasks to the list once they're done
+    pending_generators = []
     for task_generator in pylewm.commands.TASK_GENERATORS:
-        for task_function in task_generator:
-            options.append(TaskOption(task_function.task_name, task_function.task_detail, task_function))
+        cached_tasks = task_generator.get_cached_tasks()
+        if cached_tasks is not None:
+            pylewm.perf.count("Task generator cache hits")
+            options += get_generated_task_options(task_generator, cached_tasks)
+        else:
+            pylewm.perf.count("Task generator cache misses")
+            pending_generators.append(task_generator)
 
     mode = pylewm.modes.list_mode.ListMode(hotkeys, options)
     mode.bg_selected_color = (80, 160, 80)
-    mode()
\ No newline at end of file
+    mode()
+
+    for task_generator in pending_generators:
+        pylewm.commands.AsyncCommandThreadPool.submit(run_task_generator, task_generator, mode)
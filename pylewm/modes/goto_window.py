@@ -1,6 +1,6 @@
 import pylewm
 import pylewm.modes.list_mode
-from pylewm.window import WindowsByProxy, WindowState
+import pylewm.window_index
 
 class WindowOption(pylewm.modes.list_mode.ListOption):
     def __init__(self, window):
@@ -17,27 +17,9 @@ class WindowOption(pylewm.modes.list_mode.ListOption):
 
 @pylewm.commands.PyleCommand
 def start_goto_window(hotkeys = {}):
-    options = []
-    for proxy, window in WindowsByProxy.items():
-        if window.closed:
-            continue
-        if window.state == WindowState.IgnorePermanent:
-            continue
-        if window.is_taskbar:
-            continue
-        if window.window_info.cloaked:
-            continue
-        if window.window_title == "":
-            continue
-        if window.real_position.height == 0 or window.real_position.width == 0:
-            continue
-        if not window.space:
-            if not window.window_info.visible and not window.window_info.is_minimized() and not window.tab_group:
-                continue
-        if window.is_dropdown:
-            continue
-        option = WindowOption(window)
-        options.append(option)
+    index = pylewm.window_index.GotoWindows
+    options = index.create_options(WindowOption)
 
     mode = pylewm.modes.list_mode.ListMode(hotkeys, options)
-    mode()
\ No newline at end of file
+    index.watch_list_mode(mode, options)
+    mode()
@@ -1,16 +1,17 @@
 import pylewm.modes.overlay_mode
 import pylewm.modes.hint_helpers
 import pylewm.commands
+import pylewm.control_discovery
 import pylewm
 from pylewm.rects import Rect
 
-import pywinauto
-import pywinauto.uia_defines
-
 class HintControl:
     pass
 
 class HintControlsMode(pylewm.modes.overlay_mode.OverlayMode):
+    # How many controls we make room for in the hints of a window we haven't looked at before
+    ExpectedControlCount = 100
+
     def __init__(self, hintkeys, hotkeys, clickmode):
         self.window = pylewm.focus.FocusWindow
         self.cover_area = self.window.real_position
@@ -28,66 +29,60 @@ class HintControlsMode(pylewm.modes.overlay_mode.OverlayMode):
 
         self.controls = []
 
-        pylewm.commands.AsyncCommandThreadPool.submit(self.thread_find_controls)
+        pylewm.control_discovery.UiaThread.submit(self.thread_find_controls)
         self.overlay_window(self.window)
 
         super(HintControlsMode, self).__init__(hotkeys)
 
     def thread_find_controls(self):
-        uia_desktop = pywinauto.Desktop(backend="uia", allow_magic_lookup=False)
-        uia_window = uia_desktop.window(handle=self.window.proxy._hwnd)
-        uia_wrapper = uia_window.wrapper_object()
-
-        def add_control(control):
-            control_rect = control.rectangle()
-
-            hint = HintControl()
-            hint.rect = Rect.from_pos_size(
-                (control_rect.left - self.cover_area.left, control_rect.top - self.cover_area.top),
-                (control_rect.right - control_rect.left, control_rect.bottom - control_rect.top)
-            )
-            if hint.rect.width == 0 or hint.rect.height == 0:
-                return
-            if hint.rect.height < 20:
-                hint.rect.bottom += 20 - hint.rect.height
-
-            hint.control = control
-            self.controls.append(hint)
-
-        def is_control_interactable(control):
-            control_class = control.friendly_class_name()
-            if control_class == "Edit":
-                if not control.is_editable():
-                    return False
-            return True
-
-        iuia = pywinauto.uia_defines.IUIA()
-
-        condition_list = []
-        for type_name in ("Button", "TabItem", "MenuItem", "Edit", "ListItem", "TreeItem", "SplitButton", "CheckBox", "ComboBox", "Hyperlink"):
-            condition_list.append(iuia.iuia.CreatePropertyCondition(
-                iuia.UIA_dll.UIA_ControlTypePropertyId,
-                iuia.known_control_types[type_name]
-            ))
-        condition = iuia.iuia.CreateOrConditionFromArray(condition_list)
-
-        scope = iuia.tree_scope["descendants"]
-        cache_enable = True
-
-        children = uia_wrapper._element_info._get_elements(scope, condition, cache_enable)
-        for element in children:
-            control = uia_wrapper.backend.generic_wrapper_class(element)
-            if is_control_interactable(control):
-                add_control(control)
-
-        pylewm.modes.hint_helpers.create_hints(self.controls, self.hintkeys)
-        self.has_controls = True
+        hwnd = self.window.proxy._hwnd
+        expected_count = pylewm.control_discovery.get_expected_count(hwnd)
+        if expected_count is None:
+            expected_count = self.ExpectedControlCount
+        hints = pylewm.modes.hint_helpers.StableHints(self.hintkeys, expected_count)
+
+        for batch in pylewm.control_discovery.discover_controls(
+                hwnd, self.window.window_title, tuple(self.cover_area.coordinates),
+                should_stop=lambda: self.closed):
+            controls = []
+            for control, control_rect in batch:
+                hint = HintControl()
+                hint.rect = Rect((
+                    control_rect[0] - self.cover_area.left, control_rect[1] - self.cover_area.top,
+                    control_rect[2] - self.cover_area.left, control_rect[3] - self.cover_area.top,
+                ))
+                if hint.rect.width == 0 or hint.rect.height == 0:
+                    continue
+                if hint.rect.height < 20:
+                    hint.rect.bottom += 20 - hint.rect.height
+
+                hint.control = control
+                controls.append(hint)
+
+            # Hints are handed out in the order controls are found, so ones already shown never change
+            hints.assign(controls)
+            with pylewm.hotkeys.ModeLock:
+                self.controls.extend(controls)
+                if self.selection_text:
+                    self.update_selection()
+
+        with pylewm.hotkeys.ModeLock:
+            self.has_controls = True
+            if self.selection_text:
+                self.update_selection()
 
     def close(self):
         self.closed = True
         pylewm.hotkeys.queue_command(pylewm.hotkeys.escape_mode)
 
+    def end_mode(self):
+        # Escaping the mode doesn't go through close(), discovery still needs to know it should stop
+        self.closed = True
+        super(HintControlsMode, self).end_mode()
+
     def update_selection(self):
+        if self.closed:
+            return
         any_hints = False
         for control in self.controls:
             if control.hint == self.selection_text:
@@ -95,12 +90,15 @@ class HintControlsMode(pylewm.modes.overlay_mode.OverlayMode):
                 break
             elif control.hint.startswith(self.selection_text):
                 any_hints = True
-        if not any_hints:
+        # While controls are still being found, the hint being typed may not have shown up yet
+        if not any_hints and self.has_controls:
             self.selection_text = ""
 
     def confirm_selection(self, control):
         self.close()
+        pylewm.control_discovery.UiaThread.submit(self.thread_click_control, control)
 
+    def thread_click_control(self, control):
         if self.clickmode == "left":
             try:
                 control.control.invoke()
@@ -116,7 +114,7 @@ class HintControlsMode(pylewm.modes.overlay_mode.OverlayMode):
     def handle_key(self, key, isMod):
         if self.closed:
             return None
-        if not isMod and key.down and self.has_controls:
+        if not isMod and key.down and self.controls:
             if len(key.key) == 1 and not key.alt.isSet and not key.app.isSet and not key.ctrl.isSet and not key.win.isSet:
                 self.selection_text += key.key
                 self.update_selection()
@@ -132,7 +130,7 @@ class HintControlsMode(pylewm.modes.overlay_mode.OverlayMode):
         if self.closed:
             return
 
-        if not self.has_controls:
+        if not self.has_controls and not self.controls:
             overlay.draw_text("...", self.hint_color,
                 Rect((0, 0, self.cover_area.width, self.cover_area.height)),
                 (0.5, 0.5), font=overlay.font_small, background_box=(0,0,0))
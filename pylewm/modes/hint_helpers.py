@@ -13,4 +13,33 @@ def create_hints(item_list, hintkeys):
         n = i
         for d in range(0, depth):
             item.hint += hintkeys[n % key_count]
-            n = int(n / key_count)
\ No newline at end of file
+            n = int(n / key_count)
+
+
+class StableHints:
+    """ Hands out hints one at a time for items that arrive over time, without changing hints already given out.
+        All hints have the same length, the last one of each length is instead used as the prefix of the next block. """
+    def __init__(self, hintkeys, expected_count):
+        self.hintkeys = hintkeys
+        self.depth = 1
+        key_count = len(hintkeys)
+        while key_count ** self.depth - 1 < expected_count and key_count > 1:
+            self.depth += 1
+
+        self.block_size = max(key_count ** self.depth - 1, 1)
+        self.count = 0
+
+    def next_hint(self):
+        key_count = len(self.hintkeys)
+        block, n = divmod(self.count, self.block_size)
+        self.count += 1
+
+        hint = self.hintkeys[-1] * (self.depth * block)
+        for d in range(0, self.depth):
+            hint += self.hintkeys[n % key_count]
+            n = int(n / key_count)
+        return hint
+
+    def assign(self, item_list):
+        for item in item_list:
+            item.hint = self.next_hint()
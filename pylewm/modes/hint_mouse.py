@@ -1,10 +1,12 @@
 import pylewm.modes.overlay_mode
 import pylewm.modes.hint_helpers
 import pylewm
+import pylewm.perf
+import pylewm.screen_capture
+import pylewm.screen_grid
 from pylewm.rects import Rect
 import win32gui, win32api, win32con
-import array
-import ctypes
+import time
 
 class HintRegion:
     pass
@@ -20,10 +22,10 @@ class HintMouseMode(pylewm.modes.overlay_mode.OverlayMode):
         self.clickmode = clickmode
         self.hintkeys = hintkeys
 
+        # Capture before the overlay is up, so we only see what's in the window
+        self.image = pylewm.screen_capture.capture(self.cover_area)
         self.overlay_window(self.window)
 
-        self.image = None
-
         self.line_color = (128, 128, 255)
         self.hint_color = (255, 255, 0)
         self.center_color = (255, 0, 128)
@@ -60,62 +62,38 @@ class HintMouseMode(pylewm.modes.overlay_mode.OverlayMode):
         self.start_region_mode()
         super(HintMouseMode, self).__init__(hotkeys)
 
-    def is_boring(self, rect):
-        if not self.image:
-            return False
-        data = self.image.raw
-        stride = self.image.width * 4
-
-        x_min = max(0, rect.left)
-        x_max = min(self.image.width, rect.right)
-        y_min = max(0, rect.top)
-        y_max = min(self.image.height, rect.bottom)
-
-        index = y_min*stride + x_min*4
-
-        b = data[index]
-        g = data[index+1]
-        r = data[index+2]
-
-        y = y_min
-        while y < y_max:
-            index = y*stride + x_min*4
-            if any(not (-5 < x-b < 5) for x in data[index:index+(x_max-x_min)*4:4]):
-                return False
-            if any(not (-5 < x-g < 5) for x in data[index+1:index+(x_max-x_min)*4+1:4]):
-                return False
-            if any(not (-5 < x-r < 5) for x in data[index+2:index+(x_max-x_min)*4+2:4]):
-                return False
-            y += 1
-
-        return True
-
     def start_region_mode(self):
         self.region_mode = True
         self.regions = []
 
-        y = 10
-        while y < self.cover_area.height - 10:
-            x = 10
-            while x < self.cover_area.width - 10:
-                # If the region is all one color in the image, we consider it boring
-                # and we don't add a hint to it!
-                rect = Rect((
-                    x, y,
-                    min(x + self.region_width, self.cover_area.width-10),
-                    min(y + self.region_height, self.cover_area.height-10)
-                ))
-                x += self.region_width
-
-                if self.is_boring(rect):
+        start_time = time.perf_counter()
+        grid_area = (10, 10, self.cover_area.width - 10, self.cover_area.height - 10)
+        cell_size = (self.region_width, self.region_height)
+
+        # If a region is all one color in the image, we consider it boring
+        # and we don't add a hint to it!
+        boring = None
+        if self.image is not None:
+            boring = pylewm.screen_grid.get_boring_cells(self.image, grid_area, cell_size)
+
+        rows, columns = pylewm.screen_grid.get_grid_shape(grid_area, cell_size)
+        for row in range(rows):
+            y = grid_area[1] + row * self.region_height
+            for column in range(columns):
+                if boring is not None and boring[row, column]:
                     continue
 
+                x = grid_area[0] + column * self.region_width
                 region = HintRegion()
-                region.rect = rect
+                region.rect = Rect((
+                    x, y,
+                    min(x + self.region_width, grid_area[2]),
+                    min(y + self.region_height, grid_area[3])
+                ))
                 self.regions.append(region)
-            y += self.region_height
 
         pylewm.modes.hint_helpers.create_hints(self.regions, self.hintkeys)
+        pylewm.perf.record_since("Hint grid analysis time", start_time)
 
     def start_points_mode(self, region):
         self.selected_region = region
@@ -12,7 +12,6 @@ class HintWindowMode(pylewm.modes.overlay_mode.OverlayMode):
         super(HintWindowMode, self).__init__(hotkeys)
         self.hintkeys = hintkeys
         self.item_list = []
-        self.overlay_global()
 
         self.bg_color = (0,0,0)
         self.hint_color = (255,255,0)
@@ -26,6 +25,8 @@ class HintWindowMode(pylewm.modes.overlay_mode.OverlayMode):
         self.max_hidden_row = 10
         self.closed = False
         self.dirty = True
+        # None until the first full draw, after that only items whose hint visibility changed are redrawn
+        self.redraw_regions = None
 
         hidden_windows = {}
         for proxy, window in WindowsByProxy.items():
@@ -80,6 +81,9 @@ class HintWindowMode(pylewm.modes.overlay_mode.OverlayMode):
 
         pylewm.modes.hint_helpers.create_hints(self.item_list, self.hintkeys)
 
+        # Only the monitors that actually have hints need to be covered
+        self.overlay_global([item.rect for item in self.item_list])
+
         if not self.item_list:
             self.close()
 
@@ -92,6 +96,17 @@ class HintWindowMode(pylewm.modes.overlay_mode.OverlayMode):
             return True
         return False
 
+    def get_redraw_regions(self):
+        regions = self.redraw_regions
+        self.redraw_regions = []
+        return regions
+
+    def get_item_draw_rect(self, item):
+        rect = self.abs_to_overlay(item.rect)
+        if item.is_hidden:
+            return rect
+        return Rect.centered_around(rect.center, self.box_size)
+
     def close(self):
         self.closed = True
         pylewm.hotkeys.queue_command(pylewm.hotkeys.escape_mode)
@@ -103,8 +118,13 @@ class HintWindowMode(pylewm.modes.overlay_mode.OverlayMode):
     def end_mode(self):
         super(HintWindowMode, self).end_mode()
 
-    def update_selection(self):
+    def update_selection(self, previous_text):
         self.dirty = True
+        if self.redraw_regions is not None:
+            for item in self.item_list:
+                if item.hint.startswith(previous_text) != item.hint.startswith(self.selection_text):
+                    self.redraw_regions.append(self.get_item_draw_rect(item))
+
         any_hints = False
         for item in self.item_list:
             if item.hint == self.selection_text:
@@ -113,19 +133,22 @@ class HintWindowMode(pylewm.modes.overlay_mode.OverlayMode):
             elif item.hint.startswith(self.selection_text):
                 any_hints = True
         if not any_hints:
-            self.selection_text = ""
+            self.update_selection_text("")
+
+    def update_selection_text(self, text):
+        previous_text = self.selection_text
+        self.selection_text = text
+        self.update_selection(previous_text)
 
     def handle_key(self, key, isMod):
         if self.closed:
             return True
         if not isMod and key.down:
             if len(key.key) == 1 and not key.alt.isSet and not key.app.isSet and not key.ctrl.isSet and not key.win.isSet:
-                self.selection_text += key.key
-                self.update_selection()
+                self.update_selection_text(self.selection_text + key.key)
                 return True
             elif key.key == 'backspace' and len(self.selection_text) >= 1:
-                self.selection_text = self.selection_text[:-1]
-                self.update_selection()
+                self.update_selection_text(self.selection_text[:-1])
                 return True
         return super(HintWindowMode, self).handle_key(key, isMod)
 
@@ -1,7 +1,10 @@
 import pylewm
 import pylewm.modes.overlay_mode
+import pylewm.screen_capture
+import pylewm.screen_grid
 import win32api, win32con, win32gui
 import time
+import math
 from pylewm.rects import Rect
 
 class KeyNavMode(pylewm.modes.overlay_mode.OverlayMode):
@@ -10,19 +13,23 @@ class KeyNavMode(pylewm.modes.overlay_mode.OverlayMode):
         self.cover_area = self.window.real_position.padded(8, 8)
 
         self.rect = Rect((8, 8, self.cover_area.width, self.cover_area.height))
+        self.image = pylewm.screen_capture.capture(self.cover_area)
+        self.boring_quadrants = None
         self.overlay_window(self.window)
 
         self.line_color = (255, 0, 0)
+        self.boring_line_color = (96, 0, 0)
         self.line_width = 3
 
         self.target_color = (0, 255, 255)
         self.target_width = 6
 
         self.rect_history = []
-        self.update_rect()
-
         super(KeyNavMode, self).__init__(hotkeys)
 
+        # Last, so the first boring quadrants are found with the capture and everything else set up
+        self.update_rect()
+
     def split_left(self):
         self.rect = Rect((
             self.rect.left,
@@ -118,24 +125,42 @@ class KeyNavMode(pylewm.modes.overlay_mode.OverlayMode):
             pass # Not allowed, probably an administrator window has focus or something
 
         self.rect_history.append(self.rect)
+        self.update_boring_quadrants()
+
+    def update_boring_quadrants(self):
+        """ Find which quarters of the current rect are all one color, so they can be drawn less prominently. """
+        self.boring_quadrants = None
+        if self.image is None:
+            return
+
+        cell_size = (math.ceil(self.rect.width / 2), math.ceil(self.rect.height / 2))
+        boring = pylewm.screen_grid.get_boring_cells(self.image,
+            (self.rect.left, self.rect.top, self.rect.right, self.rect.bottom), cell_size)
+        if boring.shape == (2, 2):
+            self.boring_quadrants = boring
+
+    def get_quadrant_color(self, row, column):
+        if self.boring_quadrants is not None and self.boring_quadrants[row, column]:
+            return self.boring_line_color
+        return self.line_color
 
     def draw(self, overlay):
         overlay.draw_border(Rect((
             self.rect.left, self.rect.top,
             self.rect.left + self.rect.width / 2, self.rect.top + self.rect.height / 2
-        )), self.line_color, self.line_width)
+        )), self.get_quadrant_color(0, 0), self.line_width)
         overlay.draw_border(Rect((
             self.rect.left + self.rect.width / 2, self.rect.top,
             self.rect.right, self.rect.top + self.rect.height / 2
-        )), self.line_color, self.line_width)
+        )), self.get_quadrant_color(0, 1), self.line_width)
         overlay.draw_border(Rect((
             self.rect.left, self.rect.top + self.rect.height / 2,
             self.rect.left + self.rect.width / 2, self.rect.bottom
-        )), self.line_color, self.line_width)
+        )), self.get_quadrant_color(1, 0), self.line_width)
         overlay.draw_border(Rect((
             self.rect.left + self.rect.width / 2, self.rect.top + self.rect.height / 2,
             self.rect.right, self.rect.bottom
-        )), self.line_color, self.line_width)
+        )), self.get_quadrant_color(1, 1), self.line_width)
         overlay.draw_box(Rect((
             self.rect.left + self.rect.width / 2 - self.target_width, self.rect.top + self.rect.height / 2 - self.target_width,
             self.rect.left + self.rect.width / 2 + self.target_width, self.rect.top + self.rect.height / 2 + self.target_width,
@@ -1,9 +1,20 @@
 import pylewm
 import pylewm.modes.overlay_mode
+import pylewm.perf
 from pylewm.rects import Rect
-from fuzzywuzzy import fuzz
+from fuzzywuzzy import fuzz, utils
+import threading
+import heapq
+import time
+
+def get_sorted_tokens(text):
+    """ Process text the same way fuzz.token_sort_ratio does, so it can be done once up front. """
+    return " ".join(sorted(utils.full_process(text, force_ascii=True).split())).strip()
 
 class ListOption():
+    name_lower = None
+    name_tokens = None
+
     def __init__(self, name, detail=None):
         self.name = name
         self.detail = detail
@@ -11,19 +22,28 @@ class ListOption():
     def confirm(self):
         pass
 
-    def filter(self, text, filter_obj):
-        name_lower = self.name.lower()
-        score = 100
+    def prepare_filter(self):
+        if self.name_lower is None:
+            self.name_lower = self.name.lower()
+        if self.name_tokens is None:
+            self.name_tokens = get_sorted_tokens(self.name)
 
-        contains_all = True
+    def count_missing_phrases(self, filter_obj):
+        missing = 0
         for phrase in filter_obj.phrases:
-            if phrase not in name_lower:
-                score -= 100
+            if phrase not in self.name_lower:
+                missing += 1
+        return missing
+
+    def filter(self, text, filter_obj, missing_phrases=None):
+        if missing_phrases is None:
+            missing_phrases = self.count_missing_phrases(filter_obj)
+        score = 100 - missing_phrases * 100
 
-        if name_lower.startswith(filter_obj.text_lower):
+        if self.name_lower.startswith(filter_obj.text_lower):
             score += 50
 
-        score += fuzz.token_sort_ratio(text, self.name)
+        score += fuzz.ratio(filter_obj.text_tokens, self.name_tokens)
         if score < 25:
             return 0
         else:
@@ -34,15 +54,30 @@ class ListFilterObj():
         pass
 
 class ListMode(pylewm.modes.overlay_mode.OverlayMode):
+    # Above this many options filtering runs in the background and results stream in
+    AsyncFilterThreshold = 1000
+    AsyncFilterChunk = 250
+
     def __init__(self, hotkeys, options):
+        for opt in options:
+            opt.prepare_filter()
+
         self.all_options = options
         self.options = options
         self.selected_index = 0 
         self.has_selection = False
 
+        # Every (score, index, option) that matched the current filter, only the best are kept in self.options
+        self.matched = [(0, index, opt) for index, opt in enumerate(options)]
+        # Options that can still match when the filter text grows, see narrow_filter()
+        self.candidates = options
+        self.candidates_text = ""
+        self.filter_generation = 0
+
         self.filter_text = ""
         self.closed = False
         self.dirty = True
+        self.redraw_regions = None
 
         self.displayed_count = 7
         self.context_pre = 3
@@ -55,6 +90,8 @@ class ListMode(pylewm.modes.overlay_mode.OverlayMode):
         self.filter_color = (128, 255, 128)
         self.bg_selected_color = (0, 128, 255)
 
+        self.result_limit = self.displayed_count + self.context_pre
+
         self.overlay_monitor(pylewm.focus.get_focused_monitor())
         super(ListMode, self).__init__(hotkeys)
 
@@ -67,15 +104,55 @@ class ListMode(pylewm.modes.overlay_mode.OverlayMode):
             return True
         return False
 
-    def select_next(self):
-        self.selected_index = min(self.selected_index+1, len(self.options)-1)
+    def get_redraw_regions(self):
+        regions = self.redraw_regions
+        self.redraw_regions = None
+        return regions
+
+    def get_box_rect(self):
+        box_left = (self.overlay_rect.width - self.box_width) / 2
+        return Rect((
+            box_left,
+            0,
+            box_left + self.box_width,
+            self.displayed_count * self.row_height + 10 + 40
+        ))
+
+    def get_start_index(self, selected_index):
+        return max(0, selected_index - self.context_pre)
+
+    def get_row_rect(self, box, position_index):
+        return Rect((
+            box.left, box.top + self.row_height * position_index,
+            box.right, box.top + self.row_height * (position_index + 1) + 5
+        ))
+
+    def change_selection(self, new_index):
+        start_index = self.get_start_index(self.selected_index)
+        if (not self.dirty and self.selected_index >= 0 and new_index >= 0
+                and start_index == self.get_start_index(new_index)):
+            # The list didn't scroll, so only the two rows whose highlight moved need redrawing
+            box = self.get_box_rect()
+            self.redraw_regions = [
+                self.get_row_rect(box, self.selected_index - start_index),
+                self.get_row_rect(box, new_index - start_index),
+            ]
+        else:
+            self.redraw_regions = None
+
+        self.selected_index = new_index
         self.has_selection = True
         self.dirty = True
 
+    def select_next(self):
+        if self.selected_index + 1 >= len(self.options) and len(self.matched) > len(self.options):
+            # Only the best results are ranked, pull in more once we scroll past them
+            self.result_limit += self.displayed_count
+            self.update_options()
+        self.change_selection(min(self.selected_index+1, len(self.options)-1))
+
     def select_prev(self):
-        self.selected_index = max(self.selected_index-1, 0)
-        self.has_selection = True
-        self.dirty = True
+        self.change_selection(max(self.selected_index-1, 0))
 
     def confirm_selection(self):
         self.close()
@@ -90,6 +167,7 @@ class ListMode(pylewm.modes.overlay_mode.OverlayMode):
         obj = ListFilterObj()
         obj.phrases = [x.lower() for x in self.filter_text.split(" ")]
         obj.text_lower = self.filter_text.lower()
+        obj.text_tokens = get_sorted_tokens(self.filter_text)
         return obj
 
     def handle_key(self, key, isMod):
@@ -119,20 +197,110 @@ class ListMode(pylewm.modes.overlay_mode.OverlayMode):
 
     def update_filter(self):
         self.dirty = True
+        self.redraw_regions = None
+        self.filter_generation += 1
         filter_obj = self.get_filter_obj()
+        start_time = time.perf_counter()
 
+        # Typing more can only rule out more options, so narrow down from what could still match last time
+        if self.candidates_text is not None and self.filter_text.startswith(self.candidates_text):
+            pool = self.candidates
+        else:
+            pool = self.all_options
+        self.candidates_text = None
+
+        self.matched = []
+        self.result_limit = self.displayed_count + self.context_pre
+
+        if len(pool) > self.AsyncFilterThreshold:
+            threading.Thread(
+                target=self.filter_async,
+                args=(self.filter_generation, self.filter_text, filter_obj, pool, start_time),
+                daemon=True
+            ).start()
+        else:
+            matched, candidates = self.filter_options(filter_obj, pool)
+            self.add_filter_results(matched)
+            self.finish_filter(self.filter_text, candidates, start_time)
+
+    def filter_options(self, filter_obj, pool):
+        matched = []
+        candidates = []
+        for opt in pool:
+            missing_phrases = opt.count_missing_phrases(filter_obj)
+            # Phrases only ever stop matching as the text grows, so with two missing this can never score again
+            if missing_phrases > 1:
+                continue
+            candidates.append(opt)
+
+            score = opt.filter(filter_obj.text_lower, filter_obj, missing_phrases)
+            if score > 0:
+                matched.append((score, opt))
+        return matched, candidates
+
+    def filter_async(self, generation, filter_text, filter_obj, pool, start_time):
+        all_candidates = []
+        for chunk_start in range(0, len(pool), self.AsyncFilterChunk):
+            if generation != self.filter_generation:
+                return
+
+            matched, candidates = self.filter_options(filter_obj, pool[chunk_start:chunk_start+self.AsyncFilterChunk])
+            all_candidates += candidates
+
+            with pylewm.hotkeys.ModeLock:
+                if generation != self.filter_generation:
+                    return
+                self.add_filter_results(matched)
+
+        with pylewm.hotkeys.ModeLock:
+            if generation == self.filter_generation:
+                self.finish_filter(filter_text, all_candidates, start_time)
+
+    def add_filter_results(self, matched):
+        for score, opt in matched:
+            self.matched.append((score, len(self.matched), opt))
+        self.update_options()
+
+    def finish_filter(self, filter_text, candidates, start_time):
+        self.candidates = candidates
+        self.candidates_text = filter_text
+        pylewm.perf.record_since("List filter time", start_time)
+
+    def add_options(self, options):
+        for opt in options:
+            opt.prepare_filter()
+        self.all_options.extend(options)
+
+        # Having extra candidates is harmless, narrowing only ever leaves options out
+        if self.candidates_text is not None:
+            self.candidates = self.candidates + options
+        self.update_filter()
+
+    def rename_option(self, option, name):
+        option.name = name
+        option.name_lower = None
+        option.name_tokens = None
+        option.prepare_filter()
+
+        # The option may now match text it didn't match before, so narrowing can't be trusted
+        self.candidates_text = None
+        self.update_filter()
+
+    def remove_option(self, option):
+        if option in self.all_options:
+            self.all_options.remove(option)
+        self.candidates_text = None
+        self.update_filter()
+
+    def update_options(self):
         selected_option = None
-        if self.selected_index != -1:
+        if 0 <= self.selected_index < len(self.options):
             selected_option = self.options[self.selected_index]
         self.selected_index = -1
 
-        self.options = []
-        for opt in self.all_options:
-            opt.score = opt.filter(self.filter_text, filter_obj)
-            if opt.score > 0:
-                self.options.append(opt)
-
-        self.options.sort(key = lambda x: x.score, reverse=True)
+        # Ties keep the order the options were given in
+        best = heapq.nlargest(self.result_limit, self.matched, key=lambda entry: (entry[0], -entry[1]))
+        self.options = [opt for score, index, opt in best]
 
         if self.has_selection:
             for i, opt in enumerate(self.options):
@@ -142,28 +310,22 @@ class ListMode(pylewm.modes.overlay_mode.OverlayMode):
         if self.selected_index == -1 and len(self.options) > 0:
             self.selected_index = 0
 
+        self.redraw_regions = None
+        self.dirty = True
+
     def draw(self, overlay):
         if self.closed:
             return
-        box_left = (self.overlay_rect.width - self.box_width) / 2
-        box = Rect((
-            box_left,
-            0,
-            box_left + self.box_width,
-            self.displayed_count * self.row_height + 10 + 40
-        ))
+        box = self.get_box_rect()
 
-        start_index = max(0, self.selected_index - self.context_pre)
+        start_index = self.get_start_index(self.selected_index)
         end_index = min(start_index + self.displayed_count, len(self.options))
 
         overlay.draw_box(box, self.bg_color)
 
         for position_index, option_index in enumerate(range(start_index, end_index)):
             if option_index == self.selected_index:
-                overlay.draw_box(Rect((
-                    box.left, box.top + self.row_height * position_index,
-                    box.right, box.top + self.row_height * (position_index + 1) + 5
-                )), self.bg_selected_color)
+                overlay.draw_box(self.get_row_rect(box, position_index), self.bg_selected_color)
 
             option = self.options[option_index]
             has_detail = hasattr(option, "detail") and option.detail
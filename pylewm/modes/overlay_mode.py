@@ -3,6 +3,7 @@ os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = "hide"
 
 import pygame
 import pylewm.hotkeys
+import pylewm.perf
 import threading
 import win32gui
 import win32con
@@ -10,25 +11,77 @@ import win32api
 import time
 import re
 from pylewm.rects import Rect
+from collections import OrderedDict
 
 OVERLAY_WINDOW = None
 
+class TextCache:
+    """ LRU cache of rendered text surfaces, capped by how much memory the surfaces take up. """
+    def __init__(self, max_bytes):
+        self.surfaces : OrderedDict = OrderedDict()
+        self.max_bytes = max_bytes
+        self.used_bytes = 0
+
+    def render(self, font, text, color, clip_width):
+        key = (text, tuple(color), font, clip_width)
+        img = self.surfaces.get(key)
+        if img is not None:
+            self.surfaces.move_to_end(key)
+            pylewm.perf.count("Overlay text cache hits")
+            return img
+
+        pylewm.perf.count("Overlay text cache misses")
+        img = font.render(text, True, color)
+
+        # Only keep the part of the text that can actually be shown
+        if img.get_width() > clip_width:
+            img = img.subsurface((0, 0, clip_width, img.get_height())).copy()
+
+        self.surfaces[key] = img
+        self.used_bytes += self.get_surface_bytes(img)
+        while self.used_bytes > self.max_bytes and len(self.surfaces) > 1:
+            old_key, old_img = self.surfaces.popitem(last=False)
+            self.used_bytes -= self.get_surface_bytes(old_img)
+        return img
+
+    def get_surface_bytes(self, img):
+        return img.get_width() * img.get_height() * img.get_bytesize()
+
 class OverlayWindow:
+    MaxTrackedRects = 64
+
+    # How long the overlay stays hidden before its surface is released
+    IdleReleaseTime = 10.0
+    ReleaseEvent = pygame.USEREVENT + 1
+
     def __init__(self):
         self.shown = False
         self.initialized = False
         self.dirty = True
-        self.overlay_area = pylewm.monitors.DesktopArea
+        self.surface_size = None
+        self.placed_area = None
+        self.show_time = None
         self.bg_color = (255, 192, 203)
+        self.text_cache = TextCache(32 * 1024 * 1024)
+
+        # Rects touched during the current frame, these are the only parts pushed to the window
+        self.damaged = []
+        # Rects that currently hold drawn content, cleared again before the next full redraw
+        self.drawn = []
 
         self.thread = threading.Thread(target = self.window_loop)
         self.thread.start()
 
     def show(self, mode, rect):
+        self.show_time = time.perf_counter()
         self.mode = mode
         self.shown = True
         self.render_area = rect
         self.dirty = True
+        self.wake()
+
+    def wake(self):
+        # The loop sleeps on pygame events while hidden, so post one to get it to look at our state
         if self.initialized:
             pygame.event.post(pygame.event.Event(pygame.USEREVENT))
 
@@ -37,17 +90,48 @@ class OverlayWindow:
         self.mode = None
 
     def rect_overlay_to_draw(self, rect):
+        # The surface always covers exactly the render area, so overlay coordinates are draw coordinates
         return rect
-        """return Rect((
-            rect.left + self.render_area.left - self.overlay_area.left,
-            rect.top + self.render_area.top - self.overlay_area.top,
-            rect.right + self.render_area.left - self.overlay_area.left,
-            rect.bottom + self.render_area.top - self.overlay_area.top,
-        ))"""
+
+    def ensure_surface(self, size):
+        """ Make sure the surface is exactly the size of the area being drawn to. """
+        size = (max(int(size[0]), 1), max(int(size[1]), 1))
+        if size == self.surface_size:
+            return
+
+        start_time = time.perf_counter()
+        self.display = pygame.display.set_mode(size, pygame.NOFRAME | pygame.SHOWN)
+        self.display.fill(self.bg_color)
+        self.surface_size = size
+        self.drawn = []
+        self.damaged = []
+
+        pylewm.perf.record_since("Overlay surface fill time", start_time)
+        pylewm.perf.record("Overlay surface MB", size[0] * size[1] * self.display.get_bytesize() / (1024.0 * 1024.0))
+
+    def release_surface(self):
+        self.display = pygame.display.set_mode((1, 1), pygame.NOFRAME | pygame.HIDDEN)
+        self.surface_size = None
+        self.placed_area = None
+        self.drawn = []
+        self.damaged = []
+
+    def place_window(self):
+        area = self.render_area
+        self.ensure_surface(area.size)
+        win32gui.SetWindowPos(self.hwnd, win32con.HWND_TOPMOST, area.left, area.top, area.width, area.height, win32con.SWP_NOACTIVATE | win32con.SWP_ASYNCWINDOWPOS)
+        win32gui.ShowWindow(self.hwnd, win32con.SW_SHOWNOACTIVATE)
+        self.placed_area = area
+
+    def damage(self, draw_rect):
+        draw_rect = draw_rect.clip(self.display.get_clip())
+        if draw_rect.width > 0 and draw_rect.height > 0:
+            self.damaged.append(draw_rect)
+            self.drawn.append(draw_rect)
 
     def draw_box(self, rect, color):
         rect = self.rect_overlay_to_draw(rect)
-        pygame.draw.rect(self.display, color, pygame.Rect(rect.left, rect.top, rect.width, rect.height))
+        self.damage(pygame.draw.rect(self.display, color, pygame.Rect(rect.left, rect.top, rect.width, rect.height)))
 
     def draw_border(self, rect, color, width):
         rect = self.rect_overlay_to_draw(rect)
@@ -55,6 +139,7 @@ class OverlayWindow:
         pygame.draw.rect(self.display, color, pygame.Rect(rect.right - width, rect.top, width, rect.height))
         pygame.draw.rect(self.display, color, pygame.Rect(rect.left + width, rect.top, rect.width - width*2, width))
         pygame.draw.rect(self.display, color, pygame.Rect(rect.left + width, rect.bottom - width, rect.width - width*2, width))
+        self.damage(pygame.Rect(rect.left, rect.top, rect.width, rect.height))
 
     def draw_text(self, text, color, rect, align = (0.0, 0.0), font=None, background_box=None):
         rect = self.rect_overlay_to_draw(rect)
@@ -62,7 +147,7 @@ class OverlayWindow:
         if not font:
             font = self.font
 
-        img = font.render(text, True, color)
+        img = self.text_cache.render(font, text, color, max(int(rect.width), 0))
         blit_dim = [img.get_width(), img.get_height()]
 
         if blit_dim[0] > rect.width:
@@ -76,12 +161,57 @@ class OverlayWindow:
             rect = rect.shifted((0, align[1] * (rect.height - blit_dim[1])))
 
         if background_box:
-            pygame.draw.rect(self.display,
+            self.damage(pygame.draw.rect(self.display,
                 background_box, pygame.Rect(
                     rect.left - 2, rect.top - 1,
                     blit_dim[0] + 2, blit_dim[1] + 2,
-            ))
-        self.display.blit(img, (rect.left, rect.top), (0, 0, blit_dim[0], blit_dim[1]))
+            )))
+        self.damage(self.display.blit(img, (rect.left, rect.top), (0, 0, blit_dim[0], blit_dim[1])))
+
+    def clear_drawn(self):
+        """ Clear everything drawn so far back to the transparent color key. """
+        for draw_rect in self.drawn:
+            self.display.fill(self.bg_color, draw_rect)
+            self.damaged.append(draw_rect)
+        self.drawn = []
+
+    def draw_frame(self):
+        regions = self.mode.get_redraw_regions()
+        if regions is not None:
+            # Only redraw the area the mode says changed, anything drawn outside it is clipped away.
+            # The regions are merged so the mode only has to draw once, however many there are.
+            clips = []
+            for region in regions:
+                region = self.rect_overlay_to_draw(region)
+                clip = pygame.Rect(region.left, region.top, region.width, region.height)
+                clip = clip.clip(self.display.get_rect())
+                if clip.width > 0 and clip.height > 0:
+                    clips.append(clip)
+            if clips:
+                clip = clips[0].unionall(clips[1:])
+                self.display.set_clip(clip)
+                self.display.fill(self.bg_color, clip)
+                self.damaged.append(clip)
+                self.mode.draw(self)
+                self.display.set_clip(None)
+        else:
+            if self.mode.should_clear():
+                self.clear_drawn()
+            self.mode.draw(self)
+
+        # Keep the amount of tracked rects bounded for modes that draw lots of small things
+        if len(self.drawn) > self.MaxTrackedRects:
+            self.drawn = [self.drawn[0].unionall(self.drawn[1:])]
+
+    def push_damaged(self):
+        if not self.damaged:
+            return
+        if len(self.damaged) > self.MaxTrackedRects:
+            self.damaged = [self.damaged[0].unionall(self.damaged[1:])]
+
+        pylewm.perf.record("Overlay pixels pushed", sum(r.width * r.height for r in self.damaged))
+        pygame.display.update(self.damaged)
+        self.damaged = []
 
     def window_loop(self):
         pygame.init()
@@ -103,37 +233,38 @@ class OverlayWindow:
         win32gui.SetWindowLong(self.hwnd, win32con.GWL_EXSTYLE, win32gui.GetWindowLong(self.hwnd, win32con.GWL_EXSTYLE) | win32con.WS_EX_LAYERED)
         win32gui.SetLayeredWindowAttributes(self.hwnd, win32api.RGB(*self.bg_color), 0, win32con.LWA_COLORKEY)
 
-        self.display = pygame.display.set_mode(self.overlay_area.size, pygame.NOFRAME | pygame.SHOWN)
-        win32gui.SetWindowPos(self.hwnd, win32con.HWND_TOPMOST, self.overlay_area.left, self.overlay_area.top, self.overlay_area.width, self.overlay_area.height, win32con.SWP_NOACTIVATE)
-        self.display.fill(self.bg_color)
-
+        # The surface is created once a mode shows the overlay, sized to what that mode uses
         self.initialized = True
         while not pylewm.commands.stopped:
             while not self.shown and not pylewm.commands.stopped:
-                pygame.time.set_timer(pygame.USEREVENT, 100)
-                while pygame.event.wait():
-                    pygame.time.set_timer(pygame.USEREVENT, 100)
-                    if self.shown or pylewm.commands.stopped:
-                        break
+                event = pygame.event.wait()
+                if event.type == self.ReleaseEvent and not self.shown and self.surface_size:
+                    self.release_surface()
 
             if pylewm.commands.stopped:
                 break
 
-            win32gui.SetWindowPos(self.hwnd, win32con.HWND_TOPMOST, self.render_area.left, self.render_area.top, self.render_area.width, self.render_area.height, win32con.SWP_NOACTIVATE | win32con.SWP_ASYNCWINDOWPOS)
-            win32gui.ShowWindow(self.hwnd, win32con.SW_SHOWNOACTIVATE)
             active_time = None
 
             while self.shown and not pylewm.commands.stopped and self.mode and not self.mode.closed:
-                dirty = False
+                # A new mode may have been shown with a different area while we were still visible
+                if self.placed_area is not self.render_area:
+                    self.clear_drawn()
+                    self.place_window()
+
+                frame_start = None
                 with pylewm.hotkeys.ModeLock:
                     if self.mode and self.mode in pylewm.hotkeys.ModeStack:
                         if self.mode.should_draw():
-                            dirty = True
-                            if self.mode.should_clear():
-                                self.draw_box(Rect((0,0,self.render_area.width,self.render_area.height)), self.bg_color)
-                            self.mode.draw(self)
-                if dirty:
-                    pygame.display.update()
+                            frame_start = time.perf_counter()
+                            self.draw_frame()
+                if frame_start is not None:
+                    self.push_damaged()
+                    pylewm.perf.record_since("Overlay frame time", frame_start)
+
+                    if self.show_time is not None and self.mode:
+                        pylewm.perf.record_since(f"Overlay time to first frame ({type(self.mode).__name__})", self.show_time)
+                        self.show_time = None
 
                 if active_time is None:
                     active_time = time.time()
@@ -155,12 +286,28 @@ class OverlayWindow:
                                 self.mode.clicked(pos)
                     event = pygame.event.wait(10)
 
-            self.display.fill(self.bg_color)
-            pygame.display.update()
+            self.clear_drawn()
+            self.push_damaged()
             win32gui.ShowWindow(self.hwnd, win32con.SW_HIDE)
+            self.placed_area = None
+            pygame.time.set_timer(self.ReleaseEvent, int(self.IdleReleaseTime * 1000), 1)
 
         pygame.quit()
 
+def get_overlay_window():
+    global OVERLAY_WINDOW
+    if not OVERLAY_WINDOW:
+        OVERLAY_WINDOW = OverlayWindow()
+    return OVERLAY_WINDOW
+
+def prewarm_overlay():
+    """ Start the overlay in the background so the first mode using it doesn't wait for pygame to load. """
+    get_overlay_window()
+
+def stop_overlay():
+    if OVERLAY_WINDOW:
+        OVERLAY_WINDOW.wake()
+
 class OverlayMode(pylewm.hotkeys.Mode):
     def __init__(self, hotkeys):
         self.closed = False
@@ -172,32 +319,36 @@ class OverlayMode(pylewm.hotkeys.Mode):
     def should_clear(self):
         return True
 
+    def get_redraw_regions(self):
+        """ Overlay rects whose content changed since the last draw, or None to redraw everything. """
+        return None
+
     def clicked(self, pos):
         return False
 
     def overlay_window(self, window):
-        global OVERLAY_WINDOW
-        if not OVERLAY_WINDOW:
-            OVERLAY_WINDOW = OverlayWindow()
         self.overlay_rect = window.real_position
-        OVERLAY_WINDOW.show(self, self.overlay_rect)
+        get_overlay_window().show(self, self.overlay_rect)
 
     def overlay_monitor(self, monitor):
-        global OVERLAY_WINDOW
-        if not OVERLAY_WINDOW:
-            OVERLAY_WINDOW = OverlayWindow()
-
         self.overlay_rect = monitor.rect.copy()
         self.overlay_rect.bottom = self.overlay_rect.bottom - 3
-        OVERLAY_WINDOW.show(self, self.overlay_rect)
-
-    def overlay_global(self):
-        global OVERLAY_WINDOW
-        if not OVERLAY_WINDOW:
-            OVERLAY_WINDOW = OverlayWindow()
-
-        self.overlay_rect = pylewm.monitors.DesktopArea
-        OVERLAY_WINDOW.show(self, self.overlay_rect)
+        get_overlay_window().show(self, self.overlay_rect)
+
+    def overlay_global(self, used_rects=None):
+        """ Overlay every monitor, or only the monitors that any of used_rects overlap. """
+        self.overlay_rect = None
+        for monitor in pylewm.monitors.Monitors:
+            if used_rects is not None and not any(rect.overlaps(monitor.rect) for rect in used_rects):
+                continue
+            if self.overlay_rect is None:
+                self.overlay_rect = monitor.rect.copy()
+            else:
+                self.overlay_rect.extend_to_cover(monitor.rect)
+
+        if self.overlay_rect is None:
+            self.overlay_rect = pylewm.monitors.DesktopArea.copy()
+        get_overlay_window().show(self, self.overlay_rect)
 
     def abs_to_overlay(self, rect):
         return Rect((
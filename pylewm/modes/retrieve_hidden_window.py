@@ -1,6 +1,6 @@
 import pylewm
 import pylewm.modes.list_mode
-from pylewm.window import WindowsByProxy, WindowState
+import pylewm.window_index
 
 from pylewm.winproxy.winfuncs import IsWindow
 
@@ -10,6 +10,8 @@ class WindowOption(pylewm.modes.list_mode.ListOption):
         self.name = self.window.window_title
 
     def confirm(self):
+        if not IsWindow(self.window.proxy._hwnd):
+            return
         if self.window.window_info.is_minimized():
             self.window.restore()
         self.window.show()
@@ -18,33 +20,11 @@ class WindowOption(pylewm.modes.list_mode.ListOption):
 @pylewm.commands.PyleTask(name="Retrieve Hidden Window")
 @pylewm.commands.PyleCommand
 def start_retrieve_hidden_window(hotkeys = {}):
-    options = []
-    for proxy, window in WindowsByProxy.items():
-        if window.closed:
-            continue
-        if window.state == WindowState.IgnorePermanent:
-            continue
-        if window.is_taskbar:
-            continue
-        if window.window_info.cloaked:
-            continue
-        if window.window_title == "":
-            continue
-        if window.real_position.height == 0 or window.real_position.width == 0:
-            continue
-        if window.space:
-            continue
-        if window.window_info.visible:
-            continue
-        if window.is_dropdown:
-            continue
-        if not IsWindow(window.proxy._hwnd):
-            continue
-
-        option = WindowOption(window)
-        options.append(option)
+    index = pylewm.window_index.HiddenWindows
+    options = index.create_options(WindowOption)
 
     mode = pylewm.modes.list_mode.ListMode(hotkeys, options)
+    index.watch_list_mode(mode, options)
     mode()
 
 @pylewm.commands.PyleTask(name="Permanently Hide Window")
@@ -1,46 +1,195 @@
 import pylewm
+import pylewm.commands
+import pylewm.config
+import pylewm.perf
 import pylewm.modes.list_mode
 import win32gui
+import threading
+import json
+import time
 import os
 
 from win32com.shell import shell, shellcon
 
 class ApplicationOption(pylewm.modes.list_mode.ListOption):
-    def __init__(self, path):
+    def __init__(self, path, name=None, name_lower=None, name_tokens=None):
         self.path = path
-        self.name = os.path.splitext(os.path.basename(self.path))[0]
+        if name:
+            self.name = name
+        else:
+            self.name = os.path.splitext(os.path.basename(self.path))[0]
+
+        # Loaded from the index so we don't need to process every name again
+        self.name_lower = name_lower
+        self.name_tokens = name_tokens
 
     def confirm(self):
         pylewm.hotkeys.queue_command(pylewm.execution.run(["cmd.exe", "/C", self.path]))
 
-STARTMENU_ITEMS = []
-def get_startmenu_items():
-    global STARTMENU_ITEMS
-    if STARTMENU_ITEMS:
-        return STARTMENU_ITEMS
+APPLICATION_EXTENSIONS = (".lnk", ".bat", ".exe")
+
+class StartMenuIndex:
+    """ Index of the shortcuts in a set of folders, kept on disk and refreshed by only rescanning changed directories. """
+    Version = 1
+
+    def __init__(self, folders, index_path):
+        self.folders = folders
+        self.index_path = index_path
+        self.loaded = False
+        self.items = []
+
+        # Directory path -> {"mtime", "dirs", "entries"}, with entries as [path, name, mtime, name_lower, name_tokens]
+        self.dirs = {}
+
+        self.refresh_thread = None
+        self.refresh_lock = threading.Lock()
+
+    def load(self):
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as index_file:
+                data = json.load(index_file)
+        except (OSError, ValueError):
+            return False
+
+        if data.get("version") != self.Version or data.get("folders") != self.folders:
+            return False
+
+        self.dirs = data["dirs"]
+        self.items = self.build_items()
+        self.loaded = True
+        return True
+
+    def save(self):
+        data = {
+            "version": self.Version,
+            "folders": self.folders,
+            "dirs": self.dirs,
+        }
+
+        temp_path = self.index_path + ".tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as index_file:
+                json.dump(data, index_file)
+            os.replace(temp_path, self.index_path)
+        except OSError:
+            pass
+
+    def scan_dir(self, path):
+        info = {"mtime": 0, "dirs": [], "entries": []}
+        try:
+            info["mtime"] = os.stat(path).st_mtime
+            with os.scandir(path) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        info["dirs"].append(entry.path)
+                    elif entry.name.lower().endswith(APPLICATION_EXTENSIONS):
+                        name = os.path.splitext(entry.name)[0]
+                        info["entries"].append([
+                            entry.path, name, entry.stat().st_mtime,
+                            name.lower(), pylewm.modes.list_mode.get_sorted_tokens(name)
+                        ])
+        except OSError:
+            pass
+        return info
+
+    def refresh(self):
+        start_time = time.perf_counter()
+        new_dirs = {}
+        rescanned = 0
+
+        # Adding, removing or renaming anything in a directory changes its mtime, so unchanged directories can be reused
+        pending = list(reversed(self.folders))
+        while pending:
+            path = pending.pop()
+            if path in new_dirs:
+                continue
 
-    folders = [
+            info = self.dirs.get(path)
+            try:
+                mtime = os.stat(path).st_mtime
+            except OSError:
+                continue
+            if not info or info["mtime"] != mtime:
+                info = self.scan_dir(path)
+                rescanned += 1
+
+            new_dirs[path] = info
+            pending.extend(reversed(info["dirs"]))
+
+        changed = rescanned > 0 or new_dirs.keys() != self.dirs.keys()
+        self.dirs = new_dirs
+        if changed or not self.loaded:
+            self.items = self.build_items()
+            self.save()
+        self.loaded = True
+
+        pylewm.perf.record_since("Start menu index refresh time", start_time)
+        pylewm.perf.count("Start menu folders rescanned", rescanned)
+
+    def refresh_async(self):
+        with self.refresh_lock:
+            if self.refresh_thread and self.refresh_thread.is_alive():
+                return self.refresh_thread
+            self.refresh_thread = threading.Thread(target=self.refresh, daemon=True)
+            self.refresh_thread.start()
+            return self.refresh_thread
+
+    def build_items(self):
+        items = []
+        existing_items = set()
+        for info in self.dirs.values():
+            for path, name, mtime, name_lower, name_tokens in info["entries"]:
+                if name not in existing_items:
+                    items.append(ApplicationOption(path, name, name_lower, name_tokens))
+                    existing_items.add(name)
+        return items
+
+def get_startmenu_folders():
+    return [
         shell.SHGetFolderPath(0, shellcon.CSIDL_COMMON_STARTMENU, 0, 0),
         shell.SHGetFolderPath(0, shellcon.CSIDL_STARTMENU, 0, 0),
         shell.SHGetFolderPath(0, shellcon.CSIDL_DESKTOP, 0, 0),
         shell.SHGetFolderPath(0, shellcon.CSIDL_COMMON_DESKTOPDIRECTORY, 0, 0),
     ]
 
-    STARTMENU_ITEMS = []
-    existing_items = set()
-    for folder in folders:
-        for root, dirs, files in os.walk(folder):
-            for name in files:
-                if name.endswith(".lnk") or name.endswith(".bat") or name.endswith(".exe"):
-                    option = ApplicationOption(os.path.join(root, name))
-                    if option.name not in existing_items:
-                        STARTMENU_ITEMS.append(option)
-                        existing_items.add(option.name)
+STARTMENU_INDEX = None
+def get_startmenu_index():
+    global STARTMENU_INDEX
+    if not STARTMENU_INDEX:
+        STARTMENU_INDEX = StartMenuIndex(
+            get_startmenu_folders(),
+            os.path.join(pylewm.config.get_config_dir(), "StartMenuIndex.json"),
+        )
+        STARTMENU_INDEX.load()
+    return STARTMENU_INDEX
+
+def get_startmenu_items(index=None):
+    if not index:
+        index = get_startmenu_index()
 
-    return STARTMENU_ITEMS
+    refresh_thread = index.refresh_async()
+    if not index.loaded:
+        # Nothing was stored on disk yet, so this time we have to wait for the full scan
+        refresh_thread.join()
+    return index.items
+
+@pylewm.commands.PyleInit
+def init_startmenu_index():
+    # Load what we know right away and pick up anything installed since in the background
+    get_startmenu_index().refresh_async()
+
+def open_application_list(hotkeys, index=None):
+    start_time = time.perf_counter()
+    if not index:
+        index = get_startmenu_index()
+    warm = index.loaded
+
+    mode = pylewm.modes.list_mode.ListMode(hotkeys, get_startmenu_items(index))
+    mode.bg_selected_color = (160, 80, 0)
+    mode()
+
+    pylewm.perf.record_since(f"Application launcher open time ({'warm' if warm else 'cold'})", start_time)
 
 @pylewm.commands.PyleCommand
 def run_application(hotkeys = {}):
-    mode = pylewm.modes.list_mode.ListMode(hotkeys, get_startmenu_items())
-    mode.bg_selected_color = (160, 80, 0)
-    mode()
\ No newline at end of file
+    open_application_list(hotkeys)
@@ -0,0 +1,97 @@
+import pylewm
+import pylewm.commands
+import pylewm.config
+import pylewm.execution
+import pylewm.file_index
+import pylewm.perf
+import pylewm.modes.list_mode
+import threading
+import time
+import os
+
+class FileOption(pylewm.modes.list_mode.ListOption):
+    def __init__(self, root, path):
+        self.path = path
+        self.name = os.path.basename(path)
+        self.detail = os.path.basename(root)
+
+    def confirm(self):
+        pylewm.hotkeys.queue_command(pylewm.execution.run(
+            ["cmd.exe", "/C", "start", "", self.path],
+            cwd=os.path.dirname(self.path)
+        ))
+
+class FileListMode(pylewm.modes.list_mode.ListMode):
+    """ List mode that asks the file index for matches instead of scoring every option itself. """
+
+    def __init__(self, hotkeys, index):
+        self.index = index
+        super(FileListMode, self).__init__(hotkeys, [])
+        self.selected_index = -1
+
+    def update_filter(self):
+        self.dirty = True
+        self.redraw_regions = None
+        self.result_limit = self.displayed_count + self.context_pre
+        self.query_index()
+
+    def select_next(self):
+        if self.selected_index + 1 >= len(self.options) and len(self.options) >= self.result_limit:
+            # Only the best results are queried, ask for more once we scroll past them
+            self.result_limit += self.displayed_count
+            self.query_index()
+        self.change_selection(min(self.selected_index+1, len(self.options)-1))
+
+    def query_index(self):
+        # Queries over a large index can take a while, run them in the background so typing stays responsive
+        self.filter_generation += 1
+        threading.Thread(
+            target=self.query_async,
+            args=(self.filter_generation, self.filter_text, self.result_limit, time.perf_counter()),
+            daemon=True
+        ).start()
+
+    def query_async(self, generation, filter_text, result_limit, start_time):
+        results = self.index.query(filter_text, result_limit)
+        pylewm.perf.record_since("File index query time", start_time)
+
+        with pylewm.hotkeys.ModeLock:
+            if generation != self.filter_generation:
+                return
+
+            # Keep the same option objects for paths we already show, so the selection stays put
+            existing = {opt.path: opt for opt in self.options}
+            self.matched = []
+            for position, (score, root, path) in enumerate(results):
+                opt = existing.get(path)
+                if opt is None:
+                    opt = FileOption(root, path)
+                self.matched.append((score, position, opt))
+            self.update_options()
+
+FILE_INDEX = None
+def get_file_index():
+    global FILE_INDEX
+    if not FILE_INDEX:
+        FILE_INDEX = pylewm.file_index.FileIndex(
+            [os.path.expandvars(folder) for folder in pylewm.config.FileLauncherFolders],
+            os.path.join(pylewm.config.get_config_dir(), "FileIndex"),
+            pylewm.config.FileLauncherIgnoredNames,
+        )
+        FILE_INDEX.load()
+    return FILE_INDEX
+
+@pylewm.commands.PyleInit
+def init_file_index():
+    if pylewm.config.FileLauncherFolders:
+        get_file_index().refresh_async()
+
+@pylewm.commands.PyleCommand
+def run_file(hotkeys = {}):
+    index = get_file_index()
+    # Files changed since the last time are picked up in the background, results use what's indexed so far
+    index.refresh_async()
+
+    mode = FileListMode(hotkeys, index)
+    mode.bg_selected_color = (0, 128, 128)
+    mode()
@@ -0,0 +1,82 @@
+from pylewm.commands import PyleCommand, PyleTask
+import pylewm.winproxy.winfuncs as winfuncs
+
+import threading
+import time
+
+StatsLock = threading.Lock()
+Stats : dict[str, 'Stat'] = {}
+
+class Stat:
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.since = time.time()
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def reset(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.since = time.time()
+
+    def average(self):
+        if self.count == 0:
+            return 0.0
+        return self.total / self.count
+
+    def rate(self):
+        """ How many times per second this was recorded since the last reset. """
+        elapsed = time.time() - self.since
+        if elapsed <= 0.0:
+            return 0.0
+        return self.count / elapsed
+
+def get_stat(name) -> Stat:
+    stat = Stats.get(name)
+    if stat is None:
+        with StatsLock:
+            stat = Stats.get(name)
+            if stat is None:
+                stat = Stat(name)
+                Stats[name] = stat
+    return stat
+
+def count(name, amount=1):
+    """ Count an event happening, the total is the amount of times it happened. """
+    get_stat(name).add(amount)
+
+def record(name, value):
+    """ Record a measured value, such as a duration in seconds. """
+    get_stat(name).add(value)
+
+def record_since(name, start_time):
+    """ Record the time spent since a time.perf_counter() timestamp. """
+    get_stat(name).add(time.perf_counter() - start_time)
+
+def get_report():
+    lines = []
+    with StatsLock:
+        stats = sorted(Stats.values(), key=lambda stat: stat.name)
+    for stat in stats:
+        lines.append(f"{stat.name}: count={stat.count} total={stat.total:.4f} avg={stat.average():.6f} max={stat.max:.6f} rate={stat.rate():.2f}/s")
+    return "\n".join(lines)
+
+@PyleTask(name="Reset Performance Stats")
+@PyleCommand
+def reset_perf_stats():
+    with StatsLock:
+        for stat in Stats.values():
+            stat.reset()
+
+@PyleTask(name="Show Performance Stats")
+@PyleCommand.Threaded
+def show_perf_stats():
+    winfuncs.ShowMessageBox("PyleWM: Performance Stats", get_report())
@@ -51,6 +51,9 @@ pylewm.config.hotkeys({
     # -- MOD+Enter opens a fuzzy search window to start any application with a start menu / desktop shortcut
     #(*MOD, 'enter')          : pylewm.modes.select_application.run_application,
 
+    # -- MOD+O opens a fuzzy search window to open any file in pylewm.config.FileLauncherFolders
+    #(*MOD, 'o')              : pylewm.modes.select_file.run_file,
+
     # -- MOD+W opens a fuzzy search window to select any available window by name
     #(*MOD, 'w')              : pylewm.modes.goto_window.start_goto_window,
 
@@ -92,6 +95,9 @@ pylewm.config.filters([
     # EXAMPLE: Media Player Classic windows should not be tiled but left floating on top:
     #({"class": "MediaPlayerClassicW"}, pylewm.filters.Floating),
 
+    # EXAMPLE: Visual Studio can't be tiled narrower than 800 pixels:
+    #({"class": "HwndWrapper*"}, pylewm.filters.SizeLimits(min_size=(800, 0))),
+
     # EXAMPLE: Windows created with the 'Ghost' class should be ignored by PyleWM entirely
     #({"class": "Ghost"}, pylewm.filters.Ignore),
 ])
\ No newline at end of file
@@ -19,12 +19,16 @@ import pylewm.headers
 import pylewm.hotkeys
 import pylewm.commands
 import pylewm.window_update
+import pylewm.modes.overlay_mode
 
 tray_icon = None
 
 def key_process_thread():
     pylewm.hotkeys.queue_command = queue_pyle_command
-    pylewm.hotkeys.wait_for_hotkeys()
+    if pylewm.config.InputHookProcess:
+        pylewm.hotkeys.wait_for_hotkeys_in_process()
+    else:
+        pylewm.hotkeys.wait_for_hotkeys()
 
 def command_thread():
     Commands.run_with_update(
@@ -81,6 +85,9 @@ def start():
     for fun in InitFunctions:
         fun()
 
+    if pylewm.config.PrewarmOverlay:
+        pylewm.modes.overlay_mode.prewarm_overlay()
+
     threading.Thread(target=key_process_thread, daemon=True).start()
     threading.Thread(target=command_thread).start()
     threading.Thread(target=winproxy_thread).start()
@@ -104,6 +111,7 @@ def stop_threads():
     pylewm.commands.stopped = True
     Commands.queue_event.set()
     pylewm.winproxy.winupdate.ProxyCommands.queue_event.set()
+    pylewm.modes.overlay_mode.stop_overlay()
 
     if tray_icon:
         tray_icon.stop()
@@ -115,6 +123,7 @@ def restart():
     time.sleep(0.1)
     pylewm.winproxy.winupdate.proxy_cleanup()
     pylewm.headers.kill_header_process()
+    pylewm.hotkeys.kill_hook_process()
 
     os.execl(sys.executable, sys.executable, *sys.argv)
     
@@ -0,0 +1,23 @@
+import pylewm.winproxy.winfuncs as winfuncs
+import numpy as np
+
+class GdiCaptureBackend:
+    """ Copies pixels from the screen with BitBlt, so they include whatever is drawn on top of the window. """
+    def capture(self, rect):
+        width = max(int(rect.width), 1)
+        height = max(int(rect.height), 1)
+
+        pixels = np.empty((height, width, 4), dtype=np.uint8)
+        if not winfuncs.CopyScreenPixels(int(rect.left), int(rect.top), width, height, pixels.ctypes.data):
+            return None
+        return pixels
+
+Backend = GdiCaptureBackend()
+
+def set_backend(backend):
+    global Backend
+    Backend = backend
+
+def capture(rect):
+    """ Capture the pixels in a screen rect as a (height, width, channels) array in BGR(A) order, or None if that failed. """
+    return Backend.capture(rect)
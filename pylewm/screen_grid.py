@@ -0,0 +1,62 @@
+""" Analysis of captured screen pixels in a grid of cells. """
+
+import numpy as np
+
+# Cells where no color channel varies by more than this are considered to be all one color
+BORING_RANGE = 8
+
+def get_grid_shape(area, cell_size):
+    left, top, right, bottom = area
+    columns = max(int(np.ceil((right - left) / cell_size[0])), 0)
+    rows = max(int(np.ceil((bottom - top) / cell_size[1])), 0)
+    return rows, columns
+
+def get_block_ranges(blocks):
+    """ Get the color range of every block of a (rows, cell height, columns, cell width, channels) view. """
+    # Reducing the cell rows first works on whole contiguous pixel rows at a time, which is far faster than reducing both axes at once
+    block_max = blocks.max(axis=1).max(axis=2)
+    block_min = blocks.min(axis=1).min(axis=2)
+    return (block_max[..., :3] - block_min[..., :3]).max(axis=2)
+
+def get_cell_ranges(image, area, cell_size):
+    """ Get how far the color channels vary within every cell of a grid laid over an area of the image, as a (rows, columns) array.
+        Every pixel is looked at, whole cells are reduced together through a reshaped view of the pixels. """
+    left, top, right, bottom = (max(int(x), 0) for x in area)
+    cell_width, cell_height = (max(int(x), 1) for x in cell_size)
+    rows, columns = get_grid_shape((left, top, right, bottom), (cell_width, cell_height))
+
+    # Cells that aren't in the image at all are never considered all one color
+    ranges = np.full((rows, columns), 255, dtype=np.uint8)
+
+    # Alpha is left in until the end, reducing over whole pixels is much faster than over a strided channel slice
+    pixels = image[top:bottom, left:right]
+    if pixels.size == 0:
+        return ranges
+
+    height, width, channels = pixels.shape
+    full_rows = height // cell_height
+    full_columns = width // cell_width
+    full_height = full_rows * cell_height
+    full_width = full_columns * cell_width
+    extra_height = height - full_height
+    extra_width = width - full_width
+
+    if full_rows and full_columns:
+        ranges[:full_rows, :full_columns] = get_block_ranges(
+            pixels[:full_height, :full_width].reshape(full_rows, cell_height, full_columns, cell_width, channels))
+
+    # Cells cut off by the end of the area or image simply reduce over fewer pixels
+    if extra_width and full_rows:
+        ranges[:full_rows, full_columns] = get_block_ranges(
+            pixels[:full_height, full_width:].reshape(full_rows, cell_height, 1, extra_width, channels))[:, 0]
+    if extra_height and full_columns:
+        ranges[full_rows, :full_columns] = get_block_ranges(
+            pixels[full_height:, :full_width].reshape(1, extra_height, full_columns, cell_width, channels))[0]
+    if extra_height and extra_width:
+        ranges[full_rows, full_columns] = get_block_ranges(
+            pixels[full_height:, full_width:].reshape(1, extra_height, 1, extra_width, channels))[0, 0]
+    return ranges
+
+def get_boring_cells(image, area, cell_size, threshold=BORING_RANGE):
+    """ Get a (rows, columns) array that is True for every cell of the grid that is all one color. """
+    return get_cell_ranges(image, area, cell_size) <= threshold
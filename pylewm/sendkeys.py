@@ -5,10 +5,49 @@ import pylewm.winproxy.winfuncs as winfuncs
 import ctypes
 import win32api, win32con
 
-def sendKey(key):
-    sendKeySpec(KeySpec.fromTuple(key))
+# Input events are generated as plain tuples so they can be inspected without injecting them:
+#   (KEY_EVENT, vk, is_up) or (UNICODE_EVENT, character code, is_up)
+KEY_EVENT = 0
+UNICODE_EVENT = 1
+
+class SendInputBackend:
+    """ Injects a batch of events with a single SendInput call, so no other input can end up in between. """
+    def send(self, events):
+        if not events:
+            return
+        inputs = (winfuncs.INPUT * len(events))()
+        for input, (event_type, code, is_up) in zip(inputs, events):
+            input.type = winfuncs.INPUT_KEYBOARD
+            flags = winfuncs.KEYEVENTF_KEYUP if is_up else 0
+            if event_type == UNICODE_EVENT:
+                input.DUMMYUNIONNAME.ki = winfuncs.KEYBDINPUT(
+                    wVk=0, wScan=code, dwFlags=flags | winfuncs.KEYEVENTF_UNICODE, time=0, dwExtraInfo=0)
+            else:
+                input.DUMMYUNIONNAME.ki = winfuncs.KEYBDINPUT(
+                    wVk=code, wScan=0, dwFlags=flags, time=0, dwExtraInfo=0)
+        winfuncs.SendInput(len(events), inputs, winfuncs.c.sizeof(winfuncs.INPUT))
+
+class RecordingBackend:
+    """ Records batches instead of injecting them, for testing and benchmarking event generation. """
+    def __init__(self):
+        self.batches = []
+
+    def send(self, events):
+        self.batches.append(list(events))
+
+Backend = SendInputBackend()
 
-def pressModifiers(keySpec):
+def set_backend(backend):
+    global Backend
+    Backend = backend
+
+def get_vk(key):
+    if key in KEY_MAP:
+        return KEY_MAP[key]
+    # The high byte holds the shift state needed to type the character, we only want the key
+    return ctypes.windll.user32.VkKeyScanA(ctypes.wintypes.WCHAR(key)) & 0xFF
+
+def get_modifier_events(keySpec, is_up):
     modifiers = (
         (keySpec.alt, win32con.VK_LMENU, win32con.VK_RMENU),
         (keySpec.shift, win32con.VK_LSHIFT, win32con.VK_RSHIFT),
@@ -16,61 +55,55 @@ def pressModifiers(keySpec):
         (keySpec.win, win32con.VK_LWIN, win32con.VK_RWIN),
         (keySpec.app, win32con.VK_APPS, 0),
     )
+    if is_up:
+        modifiers = reversed(modifiers)
 
+    events = []
     for mod in modifiers:
         if mod[0].left or mod[0].either:
-            ctypes.windll.user32.keybd_event(mod[1], 0, 0, 0)
+            events.append((KEY_EVENT, mod[1], is_up))
         elif mod[0].right:
-            ctypes.windll.user32.keybd_event(mod[2], 0, 0, 0)
+            events.append((KEY_EVENT, mod[2], is_up))
+    return events
 
-def releaseModifiers(keySpec):
-    modifiers = (
-        (keySpec.alt, win32con.VK_LMENU, win32con.VK_RMENU),
-        (keySpec.shift, win32con.VK_LSHIFT, win32con.VK_RSHIFT),
-        (keySpec.ctrl, win32con.VK_LCONTROL, win32con.VK_RCONTROL),
-        (keySpec.win, win32con.VK_LWIN, win32con.VK_RWIN),
-        (keySpec.app, win32con.VK_APPS, 0),
-    )
+def get_keyspec_events(keySpec):
+    """ Events that press a key with exactly the modifiers it specifies. """
+    vkCode = get_vk(keySpec.key)
+    return [
+        *get_modifier_events(keySpec, False),
+        (KEY_EVENT, vkCode, False),
+        (KEY_EVENT, vkCode, True),
+        *get_modifier_events(keySpec, True),
+    ]
 
-    for mod in reversed(modifiers):
-        if mod[0].left or mod[0].either:
-            ctypes.windll.user32.keybd_event(mod[1], 0, win32con.KEYEVENTF_KEYUP, 0)
-        elif mod[0].right:
-            ctypes.windll.user32.keybd_event(mod[2], 0, win32con.KEYEVENTF_KEYUP, 0)
+def get_sequence_events(keySpecs, held_modifiers):
+    """ Events for a sequence of keys, with the modifiers that are held released around all of them. """
+    events = get_modifier_events(held_modifiers, True)
+    for keySpec in keySpecs:
+        events += get_keyspec_events(keySpec)
+    events += get_modifier_events(held_modifiers, False)
+    return events
+
+def get_text_events(text):
+    events = []
+    for char in text:
+        events.append((UNICODE_EVENT, ord(char), False))
+        events.append((UNICODE_EVENT, ord(char), True))
+    return events
+
+def sendKey(key):
+    sendKeySpec(KeySpec.fromTuple(key))
 
 def sendKeySpec(keySpec):
-    vkCode = 0
-    if keySpec.key in KEY_MAP:
-        vkCode = KEY_MAP[keySpec.key]
-    else:
-        vkCode = ctypes.windll.user32.VkKeyScanA(ctypes.wintypes.WCHAR(keySpec.key))
-
-    prev_modifiers = ActiveKey.copy()
-    
-    releaseModifiers(prev_modifiers)
-    pressModifiers(keySpec)
-    ctypes.windll.user32.keybd_event(vkCode, 0, 0, 0)
-    ctypes.windll.user32.keybd_event(vkCode, 0, win32con.KEYEVENTF_KEYUP, 0)
-    releaseModifiers(keySpec)
-    pressModifiers(prev_modifiers)
+    Backend.send(get_sequence_events([keySpec], ActiveKey.copy()))
 
 @PyleCommand
 def release_key(keySpec):
-    vkCode = 0
-    if keySpec.key in KEY_MAP:
-        vkCode = KEY_MAP[keySpec.key]
-    else:
-        vkCode = ctypes.windll.user32.VkKeyScanA(ctypes.wintypes.WCHAR(keySpec.key))
-    ctypes.windll.user32.keybd_event(vkCode, 0, win32con.KEYEVENTF_KEYUP, 0)
+    Backend.send([(KEY_EVENT, get_vk(keySpec.key), True)])
 
 @PyleCommand
 def press_key(keySpec):
-    vkCode = 0
-    if keySpec.key in KEY_MAP:
-        vkCode = KEY_MAP[keySpec.key]
-    else:
-        vkCode = ctypes.windll.user32.VkKeyScanA(ctypes.wintypes.WCHAR(keySpec.key))
-    ctypes.windll.user32.keybd_event(vkCode, 0, 0, 0)
+    Backend.send([(KEY_EVENT, get_vk(keySpec.key), False)])
 
 @PyleCommand
 def sendkey(keys):
@@ -80,36 +113,15 @@ def sendkey(keys):
 @PyleCommand
 def sendkeys(keys):
     """ Generate a list of keys to be pressed in sequence. """
-    for key in keys:
-        sendKeySpec(KeySpec.fromTuple(key))
+    keySpecs = [KeySpec.fromTuple(key) for key in keys]
+    Backend.send(get_sequence_events(keySpecs, ActiveKey.copy()))
 
 @PyleCommand
 def sendtext(text):
     """ Send keyboard events to type a string of text. """
-    for char in text:
-        input = winfuncs.INPUT()
-        input.type = winfuncs.INPUT_KEYBOARD
-        input.DUMMYUNIONNAME.ki = winfuncs.KEYBDINPUT(
-            wVk=0,
-            wScan=ord(char),
-            dwFlags=winfuncs.KEYEVENTF_UNICODE,
-            time=0,
-            dwExtraInfo=0,
-        )
-        winfuncs.SendInput(1, winfuncs.c.byref(input), winfuncs.c.sizeof(winfuncs.INPUT))
-
-        input = winfuncs.INPUT()
-        input.type = winfuncs.INPUT_KEYBOARD
-        input.DUMMYUNIONNAME.ki = winfuncs.KEYBDINPUT(
-            wVk=0,
-            wScan=ord(char),
-            dwFlags=winfuncs.KEYEVENTF_UNICODE | winfuncs.KEYEVENTF_KEYUP,
-            time=0,
-            dwExtraInfo=0,
-        )
-        winfuncs.SendInput(1, winfuncs.c.byref(input), winfuncs.c.sizeof(winfuncs.INPUT))
+    Backend.send(get_text_events(text))
 
 @PyleCommand
 def send_left_click():
     win32api.mouse_event(win32con.MOUSEEVENTF_LEFTDOWN,0,0)
-    win32api.mouse_event(win32con.MOUSEEVENTF_LEFTUP,0,0)
\ No newline at end of file
+    win32api.mouse_event(win32con.MOUSEEVENTF_LEFTUP,0,0)
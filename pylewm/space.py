@@ -1,6 +1,9 @@
 from pylewm.layouts.sidebar import SidebarLayout
 from pylewm.layouts.autogrid import AutoGridLayout
+from pylewm.layouts.scrolling import ScrollingLayout
+from pylewm.layouts.monocle import MonocleLayout
 from pylewm.window import Window
+import pylewm.window_index
 import traceback
 import threading
 
@@ -10,6 +13,8 @@ class Space:
     Layouts = [
         lambda: AutoGridLayout(),
         lambda: SidebarLayout(),
+        lambda: ScrollingLayout(),
+        lambda: MonocleLayout(),
     ]
 
     def __init__(self, monitor, rect):
@@ -39,7 +44,8 @@ class Space:
     def show(self):
         self.visible = True
         for window in self.windows:
-            window.show()
+            if not self.layout.is_window_parked(window):
+                window.show()
 
     def hide(self):
         self.visible = False
@@ -78,6 +84,7 @@ class Space:
 
         self.layout.focus_mru = self.focus_mru
         self.layout.focus = self.focus
+        self.layout.space_visible = self.visible
         self.layout.rect.assign(self.rect)
         self.layout.update_layout()
 
@@ -86,16 +93,23 @@ class Space:
 
         window.space = self
         self.windows.append(window)
+        pylewm.window_index.window_changed(window)
 
         self.layout.add_window(window, at_slot, direction)
         self.focus_mru.insert(0, window)
 
+        # Windows the previous space's layout was keeping hidden come back here, a hidden space shows them when it becomes visible
+        if self.visible and window.wm_hidden and not self.layout.is_window_parked(window):
+            if not window.tab_group or window.tab_group.visible_window is window:
+                window.show()
+
     def remove_window(self, window):
         assert window.space == self
 
         self.windows.remove(window)
         self.focus_mru.remove(window)
         window.space = None
+        pylewm.window_index.window_changed(window)
 
         if self.focus is window:
             self.focus = self.layout.get_focus_window_after_removing(window)
@@ -118,6 +132,8 @@ class Space:
 
         old_window.space = None
         new_window.space = self
+        pylewm.window_index.window_changed(old_window)
+        pylewm.window_index.window_changed(new_window)
 
         if self.focus is old_window:
             self.focus = new_window
@@ -148,6 +164,7 @@ class Space:
 
         for window in window_list:
             window.space = self
+            pylewm.window_index.window_changed(window)
 
         return self.layout.takeover_from_windows(window_list)
 
@@ -168,4 +185,10 @@ class Space:
         if not handled:
             for window in self.focus_mru:
                 drop_slot, force_drop = self.layout.get_drop_slot(window.rect.center, window.rect)
-                self.layout.add_window(window, at_slot=drop_slot)
\ No newline at end of file
+                self.layout.add_window(window, at_slot=drop_slot)
+
+        # Bring back any windows the previous layout was keeping hidden
+        if old_layout and self.visible:
+            for window in self.windows:
+                if old_layout.is_window_parked(window) and not self.layout.is_window_parked(window):
+                    window.show()
\ No newline at end of file
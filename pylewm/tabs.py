@@ -6,6 +6,7 @@ import pylewm.sendkeys
 import pylewm.hotkeys
 import pylewm.colors
 import pylewm.commands
+import pylewm.perf
 from pylewm.commands import PyleCommand, PyleTask
 import pylewm.winproxy.winfuncs
 import time
@@ -17,10 +18,15 @@ class TabGroup:
     NextTabGroupId = 0
     TabGroups = {}
 
+    # Never send header updates for one group faster than this
+    HeaderUpdateInterval = 1.0 / 20.0
+
     def __init__(self):
         TabGroup.NextTabGroupId += 1
         self.group_id = TabGroup.NextTabGroupId
         self.header : pylewm.headers.WindowHeader = None
+        self.header_dirty = False
+        self.header_sent_time = 0.0
         self.valid = True
 
         self.windows : list[pylewm.window.Window] = []
@@ -30,34 +36,44 @@ class TabGroup:
     def create_header(self):
         self.header = pylewm.headers.WindowHeader(self.group_id, self.visible_window.proxy._hwnd)
         self.update_header()
+        self.flush_header(time.time())
 
     def update_header(self):
-        if not self.header:
+        # Updates are coalesced and sent at most once per tick from update_tabgroups
+        self.header_dirty = True
+
+    def flush_header(self, now):
+        if not self.header_dirty or not self.header:
+            return
+        if now - self.header_sent_time < TabGroup.HeaderUpdateInterval:
             return
 
+        self.header_dirty = False
+        self.header_sent_time = now
+
         state = {
             "pending": (PendingTabGroup == self),
         }
         entries = []
         for window in self.windows:
-            bg_color = pylewm.colors.get_random_color_for_str_hsv(window.window_class)
-
-            if window != self.visible_window:
-                bg_color[1] *= 0.4
-                bg_color[2] *= 0.4
-
-            bg_color = pylewm.colors.hsv_to_rgb(bg_color)
-            text_color = pylewm.colors.get_text_color_for_background(bg_color)
+            is_visible = (window == self.visible_window)
+            bg_color, text_color = pylewm.colors.get_colors_for_str(window.window_class, not is_visible)
 
             entries.append({
                 "title": window.window_title,
                 "bg_color": bg_color,
                 "text_color": text_color,
-                "visible": window == self.visible_window,
+                "visible": is_visible,
             })
 
         self.header.update(self.visible_window.proxy._hwnd, entries, state)
 
+    def update_header_target(self):
+        if not self.header:
+            return
+        window = self.visible_window
+        self.header.set_target(window.proxy._hwnd, tuple(window.real_position.coordinates), window.window_info.visible)
+
     def handle_response(self, cmd):
         action = cmd[0]
 
@@ -147,6 +163,7 @@ class TabGroup:
             self.switch_to_tab(window, hide_previous=hide_previous)
         else:
             window.hide()
+            self.update_hidden_layouts()
 
         if not self.header:
             self.create_header()
@@ -173,9 +190,20 @@ class TabGroup:
                     pylewm.focus.set_focus_no_mouse(self.visible_window)
             self.update_header()
 
+    def update_hidden_layouts(self, apply_margin=True):
+        """ Size every hidden tab to the slot of the visible tab. """
+        if not self.visible_window or not self.visible_window.space:
+            return
+        for window in self.windows:
+            if window is self.visible_window or window.closed:
+                continue
+            window.set_layout(self.visible_window.layout_position, apply_margin, self.visible_window.layout_edges_flush)
+
     def switch_to_tab(self, window : 'pylewm.window.Window', hide_previous=True):
         if window == self.visible_window:
             return
+        start_time = time.perf_counter()
+        window.tab_switch_time = start_time
         window.show()
         if self.visible_window:
             if hide_previous:
@@ -190,6 +218,7 @@ class TabGroup:
                 window.move_floating_to(self.visible_window.real_position)
         self.visible_window = window
         self.update_header()
+        pylewm.perf.record_since("Tab switch command", start_time)
 
 HiddenTabWindow = None
 HiddenTabWindowSince = None
@@ -226,7 +255,9 @@ def update_tabgroups():
                 pass
             if cmd:
                 id = cmd[0]
-                if id in TabGroup.TabGroups:
+                if id is None:
+                    pylewm.headers.handle_status(cmd[1:])
+                elif id in TabGroup.TabGroups:
                     TabGroup.TabGroups[id].handle_response(cmd[1:])
     
     # If a window is focused that is hidden by a tab group, switch that tab group to it
@@ -248,6 +279,12 @@ def update_tabgroups():
     if not have_hidden_tab:
         HiddenTabWindow = None
 
+    # Send out any header changes that happened this tick
+    now = time.time()
+    for tab_group in TabGroup.TabGroups.values():
+        tab_group.flush_header(now)
+        tab_group.update_header_target()
+
 def has_focused_tab_group():
     window = pylewm.focus.FocusWindow
     if not window:
@@ -2,6 +2,8 @@ import pylewm.filters
 import pylewm.monitors
 import pylewm.focus
 import pylewm.tabs
+import pylewm.perf
+import pylewm.window_index
 from pylewm.rects import Rect
 
 from pylewm.hotkeys import MouseState
@@ -36,6 +38,7 @@ class Window:
         self.wm_becoming_visible = False
 
         self.wm_visible_since = 0
+        self.tab_switch_time = None
         self.trigger_relayout = False
         self.removed_titlebar = False
         
@@ -43,7 +46,10 @@ class Window:
 
         self.update_info_from_proxy()
         self.layout_position = self.real_position.copy()
+        self.layout_edges_flush = None
         self.layout_margin = None
+        self.layout_min_size = (0, 0)
+        self.layout_max_size = (0, 0)
         self.floating_rect = self.real_position.copy()
 
         self.dragging = False
@@ -82,6 +88,8 @@ class Window:
             elif self.state == WindowState.Tiled:
                 self.make_tiled()
 
+            pylewm.window_index.window_changed(self)
+
     def make_floating(self):
         self.state = WindowState.Floating
         self.proxy.set_always_on_top(True)
@@ -224,6 +232,9 @@ class Window:
         if self.wm_becoming_visible:
             if self.window_info.visible:
                 self.wm_becoming_visible = False
+                if self.tab_switch_time is not None:
+                    pylewm.perf.record_since("Tab switch latency", self.tab_switch_time)
+                    self.tab_switch_time = None
             else:
                 return
 
@@ -306,6 +317,7 @@ class Window:
     def update_info_from_proxy(self):
         prev_border_style = self.window_info.get_border_styles()
         prev_force_visible = self.window_info.is_force_visible
+        prev_size_limits = (self.window_info.min_size, self.window_info.max_size)
         prev_title = None
 
         if self.tab_group:
@@ -315,6 +327,8 @@ class Window:
             self.window_info.set(self.proxy.window_info)
             self.proxy.changed = False
 
+        pylewm.window_index.window_changed(self)
+
         if self.tab_group:
             if prev_title != self.window_title:
                 self.tab_group.update_header()
@@ -322,6 +336,11 @@ class Window:
         if prev_border_style != self.window_info.get_border_styles() or prev_force_visible != self.window_info.is_force_visible:
             self.trigger_relayout = True
 
+        # Learned a new size limit for this window, the layout should take it into account
+        if prev_size_limits != (self.window_info.min_size, self.window_info.max_size):
+            if self.space:
+                self.space.layout.refresh_layout()
+
     def stop_drag(self):
         if self.dragging:
             if Window.DraggingWindow is self:
@@ -440,6 +459,21 @@ class Window:
             if self.proxy.has_tab_group:
                 self.proxy.has_tab_group = False
                 self.trigger_relayout = True
+        pylewm.window_index.window_changed(self)
+
+    def get_layout_limits(self):
+        """ Get the (min_size, max_size) this window can be laid out at, 0 means unconstrained. """
+        learned_min = self.window_info.min_size
+        learned_max = self.window_info.max_size
+        min_size = (
+            max(self.layout_min_size[0], learned_min[0]),
+            max(self.layout_min_size[1], learned_min[1]),
+        )
+        max_size = (
+            self.layout_max_size[0] or learned_max[0],
+            self.layout_max_size[1] or learned_max[1],
+        )
+        return min_size, max_size
 
     @property
     def real_position(self):
@@ -451,6 +485,7 @@ class Window:
         if self.is_zoomed:
             return
         self.layout_position.assign(new_position)
+        self.layout_edges_flush = edges_flush
         self.ignore_drag_until = time.time() + 0.2
 
         if apply_margin:
@@ -458,6 +493,10 @@ class Window:
         else:
             self.proxy.set_layout(new_position, False)
 
+        # Keep the hidden tabs sized to the same slot, so switching tabs doesn't need to move anything
+        if self.tab_group and self.tab_group.visible_window is self:
+            self.tab_group.update_hidden_layouts(apply_margin)
+
     def restore_layout(self):
         self.proxy.restore_layout()
         self.ignore_drag_until = time.time() + 0.2
@@ -493,6 +532,7 @@ def execute_on_next_window(fun):
 def on_proxy_added(proxy):
     window = Window(proxy)
     WindowsByProxy[proxy] = window
+    pylewm.window_index.window_changed(window)
     window.update()
 
 def on_proxy_removed(proxy):
@@ -506,6 +546,7 @@ def on_proxy_removed(proxy):
     if window.space:
         window.space.remove_window(window)
     window.on_removed()
+    pylewm.window_index.window_changed(window)
 
     del WindowsByProxy[proxy]
 
@@ -1,12 +1,16 @@
 import win32con
+import win32api
+import threading
 import time
 
 import pylewm.window
 import pylewm.focus
+import pylewm.perf
+import pylewm.winproxy.winfuncs as winfuncs
 from pylewm.winproxy.winfocus import focus_window, focus_shell_window, get_cursor_position, determine_window_proxy_under_cursor
 
 from pylewm.commands import PyleCommand
-from pylewm.hotkeys import MouseState, OnHotkeysClear
+from pylewm.hotkeys import MouseState, OnHotkeysClear, add_mouse_hook, remove_mouse_hook, subscribe_mouse_moves, unsubscribe_mouse_moves
 from pylewm.window_update import WINDOW_UPDATE_FUNCS
 
 class DragState:
@@ -17,7 +21,20 @@ class DragState:
     DRAG_RESIZE_MODE = None
     DRAG_ACTIVATE_TIME = 0
     DRAG_START_TIME = 0
-    WAIT_PROCESS_UNTIL = 0
+    # Set once the command thread has made the window floating, after that the drag thread moves it
+    DRAG_READY = False
+    DRAG_THREAD : threading.Thread = None
+
+    # Moves are applied at most once per display frame
+    FRAME_INTERVAL = 1.0 / 60.0
+    NEXT_APPLY_TIME = 0.0
+
+    # Resizes wait until the window has actually taken on the previous size,
+    # so we never queue up more redraws than the window can keep up with
+    RESIZE_REQUESTED = None
+    RESIZE_SENT_TIME = 0.0
+    RESIZE_MAX_WAIT = 0.1
+    RESIZE_RECT = winfuncs.w.RECT()
 
 @PyleCommand
 def activate_window_drag_resize():
@@ -32,13 +49,30 @@ def activate_window_drag_resize():
 
     DragState.DRAG_ALLOWED = True
     DragState.DRAG_ACTIVATE_TIME = time.time()
-    MouseState.MOUSE_HOOKS.append(window_drag_hook)
+    DragState.FRAME_INTERVAL = 1.0 / get_display_frequency()
+    add_mouse_hook(window_drag_hook)
+    subscribe_mouse_moves()
     WINDOW_UPDATE_FUNCS.append(drag_update)
 
+    if not DragState.DRAG_THREAD or not DragState.DRAG_THREAD.is_alive():
+        DragState.DRAG_THREAD = threading.Thread(target=drag_thread, daemon=True)
+        DragState.DRAG_THREAD.start()
+
+def get_display_frequency():
+    try:
+        frequency = win32api.EnumDisplaySettings(None, win32con.ENUM_CURRENT_SETTINGS).DisplayFrequency
+        if frequency > 1:
+            return frequency
+    except:
+        pass
+    return 60
+
 def window_drag_hook(wParam):
     if wParam == win32con.WM_LBUTTONDOWN or wParam == win32con.WM_RBUTTONDOWN:
         if not DragState.DRAG_WINDOW:
-            DragState.DRAG_MOUSE_POS = get_cursor_position()
+            # Motion is tracked from the hook's mouse moves from here on
+            DragState.DRAG_MOUSE_POS = win32api.GetCursorPos()
+            MouseState.LATEST_MOVE = None
             window : pylewm.window.Window = None
 
             cursor_proxy = determine_window_proxy_under_cursor()
@@ -63,6 +97,8 @@ def window_drag_hook(wParam):
                     window = available_windows[0]
             
             if not window.is_hung():
+                DragState.DRAG_READY = False
+                DragState.RESIZE_REQUESTED = None
                 DragState.DRAG_WINDOW = window
                 DragState.DRAG_WINDOW_POS = DragState.DRAG_WINDOW.real_position.copy()
                 DragState.DRAG_START_TIME = time.time()
@@ -86,7 +122,6 @@ def window_drag_hook(wParam):
 
                     DragState.DRAG_RESIZE_MODE = (mode_x, mode_y)
                 else:
-                    pylewm.commands.set_responsive_mode(True)
                     DragState.DRAG_RESIZE_MODE = None
 
         return True
@@ -101,23 +136,22 @@ def window_drag_hook(wParam):
     return False
 
 def drag_update():
-    active_time = time.time() - DragState.DRAG_START_TIME
-
     window = DragState.DRAG_WINDOW
     if not window:
         return
 
-    if DragState.WAIT_PROCESS_UNTIL > time.time():
-        return
-
     # Stop dragging if we no longer have focus on this window
     drag_time = time.time() - DragState.DRAG_START_TIME
     if drag_time > 1.0 and pylewm.focus.FocusWindow != window:
         DragState.DRAG_WINDOW = None
         return
 
-    mouse_pos = get_cursor_position()
-    if mouse_pos == DragState.DRAG_MOUSE_POS:
+    if DragState.DRAG_READY:
+        return
+
+    # Once the mouse starts moving, prepare the window so the drag thread can take over
+    mouse_pos = MouseState.LATEST_MOVE
+    if mouse_pos is None or mouse_pos == DragState.DRAG_MOUSE_POS:
         return
 
     if window.is_tiled():
@@ -125,11 +159,51 @@ def drag_update():
     if window != pylewm.focus.FocusWindow:
         pylewm.focus.set_focus_no_mouse(window)
 
+    DragState.DRAG_READY = True
+    MouseState.MOVE_EVENT.set()
+
+def is_resize_converged(window):
+    """ Check whether the window has taken on the last size we gave it, and record how long that took. """
+    if DragState.RESIZE_REQUESTED is None:
+        return True
+
+    elapsed = time.perf_counter() - DragState.RESIZE_SENT_TIME
+    if winfuncs.GetWindowRect(window.proxy._hwnd, winfuncs.c.byref(DragState.RESIZE_RECT)):
+        rect = DragState.RESIZE_RECT
+        if (rect.left, rect.top, rect.right, rect.bottom) == DragState.RESIZE_REQUESTED:
+            pylewm.perf.record("Drag resize convergence", elapsed)
+            DragState.RESIZE_REQUESTED = None
+            return True
+
+    # Some windows never take on the exact size, don't wait for them forever
+    if elapsed > DragState.RESIZE_MAX_WAIT:
+        DragState.RESIZE_REQUESTED = None
+        return True
+    return False
+
+def apply_drag_motion():
+    """ Apply the mouse movement since the last time, returns how long to wait before trying again if we couldn't. """
+    window = DragState.DRAG_WINDOW
+    if not window or not DragState.DRAG_READY:
+        return None
+
+    mouse_pos = MouseState.LATEST_MOVE
+    if mouse_pos is None or mouse_pos == DragState.DRAG_MOUSE_POS:
+        return None
+
+    now = time.perf_counter()
+    if now < DragState.NEXT_APPLY_TIME:
+        return DragState.NEXT_APPLY_TIME - now
+
+    resizing = DragState.DRAG_RESIZE_MODE is not None
+    if resizing and not is_resize_converged(window):
+        return DragState.FRAME_INTERVAL
+
     delta = (mouse_pos[0] - DragState.DRAG_MOUSE_POS[0], mouse_pos[1] - DragState.DRAG_MOUSE_POS[1])
     DragState.DRAG_MOUSE_POS = mouse_pos
 
     pos = DragState.DRAG_WINDOW_POS.copy()
-    if DragState.DRAG_RESIZE_MODE == None:
+    if not resizing:
         pos = pos.shifted(delta)
     else:
         if DragState.DRAG_RESIZE_MODE[0] == -1:
@@ -142,24 +216,36 @@ def drag_update():
         elif DragState.DRAG_RESIZE_MODE[1] == 1:
             pos.bottom += delta[1]
 
-        # Resize operations incur redraws, so if we spam them too often
-        # it will cause lag in the resized window's process.
-        # Limit resize operations to happen at 30hz at most
-        DragState.WAIT_PROCESS_UNTIL = time.time() + (1.0 / 30.0)
+        DragState.RESIZE_REQUESTED = tuple(pos.coordinates)
+        DragState.RESIZE_SENT_TIME = now
 
     DragState.DRAG_WINDOW_POS = pos
+    DragState.NEXT_APPLY_TIME = now + DragState.FRAME_INTERVAL
+
+    window.proxy.move_floating_to(pos)
+    window.proxy.apply_floating_now()
+    pylewm.perf.count("Drag moves applied")
+    return None
 
-    window.move_floating_to(pos)
+def drag_thread():
+    """ Applies drag motion as mouse moves come in from the hook, instead of polling the cursor every tick. """
+    retry_delay = None
+    while DragState.DRAG_ALLOWED and not pylewm.commands.stopped:
+        MouseState.MOVE_EVENT.wait(retry_delay if retry_delay is not None else 0.5)
+        MouseState.MOVE_EVENT.clear()
+        retry_delay = apply_drag_motion()
 
 def stop_window_drag_resize():
     if not DragState.DRAG_ALLOWED:
         return
 
-    MouseState.MOUSE_HOOKS.remove(window_drag_hook)
+    remove_mouse_hook(window_drag_hook)
+    unsubscribe_mouse_moves()
     WINDOW_UPDATE_FUNCS.remove(drag_update)
     DragState.DRAG_ALLOWED = False
     DragState.DRAG_WINDOW = None
-    pylewm.commands.set_responsive_mode(False)
+    DragState.DRAG_READY = False
+    MouseState.MOVE_EVENT.set()
 
 @OnHotkeysClear
 def window_drag_hotkeys_cleared():
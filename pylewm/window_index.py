@@ -0,0 +1,97 @@
+import pylewm.hotkeys
+import pylewm.modes.list_mode
+from pylewm.window_classification import WindowState
+
+class WindowIndex:
+    """ Set of windows matching a condition, kept up to date as windows change instead of scanned for every use. """
+    def __init__(self, condition):
+        self.condition = condition
+        # Window -> (title, name_lower, name_tokens)
+        self.windows = {}
+        self.listeners = []
+
+    def update(self, window):
+        if not window.closed and self.condition(window):
+            title = window.window_title
+            entry = self.windows.get(window)
+            if entry is not None and entry[0] == title:
+                return
+            self.windows[window] = (title, title.lower(), pylewm.modes.list_mode.get_sorted_tokens(title))
+            for listener in list(self.listeners):
+                listener(window, title)
+        elif window in self.windows:
+            del self.windows[window]
+            for listener in list(self.listeners):
+                listener(window, None)
+
+    def create_options(self, option_type):
+        """ Create a list option for every window in the index, with its search keys already filled in. """
+        options = []
+        for window, (title, name_lower, name_tokens) in self.windows.items():
+            option = option_type(window)
+            option.name = title
+            option.name_lower = name_lower
+            option.name_tokens = name_tokens
+            options.append(option)
+        return options
+
+    def watch_list_mode(self, mode, options):
+        """ Keep the options of an open list mode in sync with titles changing and windows going away. """
+        options_by_window = {option.window: option for option in options}
+
+        def listener(window, title):
+            with pylewm.hotkeys.ModeLock:
+                if mode.closed or mode not in pylewm.hotkeys.ModeStack:
+                    self.listeners.remove(listener)
+                    return
+
+                option = options_by_window.get(window)
+                if option is None:
+                    return
+                if title is None:
+                    mode.remove_option(option)
+                    del options_by_window[window]
+                else:
+                    mode.rename_option(option, title)
+
+        self.listeners.append(listener)
+
+def is_basic_switchable(window):
+    if window.state == WindowState.IgnorePermanent:
+        return False
+    if window.is_taskbar:
+        return False
+    if window.window_info.cloaked:
+        return False
+    if window.window_title == "":
+        return False
+    if window.real_position.height == 0 or window.real_position.width == 0:
+        return False
+    if window.is_dropdown:
+        return False
+    return True
+
+def is_goto_window(window):
+    if not is_basic_switchable(window):
+        return False
+    if not window.space:
+        if not window.window_info.visible and not window.window_info.is_minimized() and not window.tab_group:
+            return False
+    return True
+
+def is_hidden_window(window):
+    if not is_basic_switchable(window):
+        return False
+    if window.space:
+        return False
+    if window.window_info.visible:
+        return False
+    return True
+
+GotoWindows = WindowIndex(is_goto_window)
+HiddenWindows = WindowIndex(is_hidden_window)
+
+def window_changed(window):
+    """ Called whenever something about a window that the indices look at may have changed. """
+    GotoWindows.update(window)
+    HiddenWindows.update(window)
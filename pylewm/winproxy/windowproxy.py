@@ -2,6 +2,7 @@ import pylewm.winproxy.winfuncs as winfuncs
 from pylewm.commands import CommandQueue, Commands
 from pylewm.rects import Rect
 import pylewm.config
+import pylewm.perf
 
 from threading import Lock
 import functools
@@ -28,6 +29,10 @@ class WindowInfo:
         self._winStyle = 0
         self._exStyle = 0
 
+        # Size limits learned from the window refusing layout positions, 0 means unconstrained
+        self.min_size = (0, 0)
+        self.max_size = (0, 0)
+
     def set(self, other : 'WindowInfo'):
         self.window_title = other.window_title
         self.window_class = other.window_class
@@ -40,6 +45,8 @@ class WindowInfo:
         self.rect.assign(other.rect)
         self._winStyle = other._winStyle
         self._exStyle = other._exStyle
+        self.min_size = other.min_size
+        self.max_size = other.max_size
 
     def can_resize(self):
         return (self._winStyle & winfuncs.WS_SIZEBOX) != 0
@@ -61,6 +68,13 @@ class WindowProxy:
     UpdateFrameCounter = 0
     UpdateStartTime = 0
 
+    # How many proxy updates to wait before checking whether a window settled on the rect we gave it
+    LayoutConvergeFrames = 3
+    # How many times in a row a window may refuse a layout rect before we stop fighting it
+    LayoutThrashThreshold = 3
+    LayoutBackoffBase = 0.5
+    LayoutBackoffMax = 60.0
+
     def __init__(self, hwnd):
         self._hwnd = hwnd
         self.initialized = False
@@ -89,6 +103,12 @@ class WindowProxy:
         self._proxy_has_tab_group = False
         self._applied_position = Rect()
 
+        self._layout_requested = None
+        self._layout_accepted = None
+        self._layout_check_frame = None
+        self._layout_mismatches = 0
+        self._layout_backoff_until = 0.0
+
         self._proxy_hidden = False
         self._proxy_always_top = False
         self._proxy_resizable = False
@@ -302,6 +322,14 @@ class WindowProxy:
             try_position[2] -= border_left+border_right+2
             try_position[3] -= border_top+border_bottom+1
 
+        requested = (
+            try_position[0], try_position[1],
+            try_position[0] + try_position[2], try_position[1] + try_position[3],
+        )
+        if not self._should_apply_layout(requested):
+            pylewm.perf.count("Layout moves skipped (backoff)")
+            return
+
         zorder = winfuncs.HWND_BOTTOM
         if self._proxy_always_top:
             zorder = winfuncs.HWND_TOPMOST
@@ -315,8 +343,82 @@ class WindowProxy:
 
         if not set_position_allowed:
             print(f"{time.time()} Failed to set {try_position} on {self}")
+            return
+
+        self._layout_requested = requested
+        self._layout_check_frame = WindowProxy.UpdateFrameCounter + WindowProxy.LayoutConvergeFrames
+
+    def _should_apply_layout(self, requested):
+        if requested != self._layout_requested:
+            # Asking for a different rect than before, the window gets a fresh chance to accept it
+            self._layout_mismatches = 0
+            self._layout_backoff_until = 0.0
+            return True
+
+        if (self._layout_accepted is not None
+                and self._info.rect.position == self._layout_accepted
+                and time.time() < self._layout_backoff_until):
+            # The window is still sitting where it snapped back to last time,
+            # moving it again would only make it fight us again
+            return False
+        return True
+
+    def _check_layout_convergence(self):
+        self._layout_check_frame = None
+
+        observed = self._info.rect.position
+        if observed == self._layout_requested:
+            self._layout_mismatches = 0
+            self._layout_backoff_until = 0.0
+            self._layout_accepted = None
+            return
+
+        self._layout_mismatches += 1
+        if self._layout_mismatches < WindowProxy.LayoutThrashThreshold:
+            return
+
+        # The window keeps ending up at a different rect than we asked for, so
+        # accept the rect it wants and back off exponentially before trying again.
+        self._layout_accepted = observed
+        backoff = WindowProxy.LayoutBackoffBase * (2 ** (self._layout_mismatches - WindowProxy.LayoutThrashThreshold))
+        self._layout_backoff_until = time.time() + min(backoff, WindowProxy.LayoutBackoffMax)
+        pylewm.perf.count(f"Layout thrash: {self._info.window_class}")
+
+        self._learn_size_limits(observed)
+
+    def _learn_size_limits(self, observed):
+        """ Learn the window's size limits in layout space from the rect it refused. """
+        requested_width = self._layout_requested[2] - self._layout_requested[0]
+        requested_height = self._layout_requested[3] - self._layout_requested[1]
+        observed_width = observed[2] - observed[0]
+        observed_height = observed[3] - observed[1]
+
+        # Margins and borders were taken off the layout rect before requesting it
+        extra_width = self._applied_position.width - requested_width
+        extra_height = self._applied_position.height - requested_height
+
+        min_width, min_height = self._info.min_size
+        max_width, max_height = self._info.max_size
+
+        if observed_width > requested_width:
+            min_width = observed_width + extra_width
+        elif observed_width < requested_width:
+            max_width = observed_width + extra_width
+
+        if observed_height > requested_height:
+            min_height = observed_height + extra_height
+        elif observed_height < requested_height:
+            max_height = observed_height + extra_height
+
+        if (min_width, min_height) != self._info.min_size or (max_width, max_height) != self._info.max_size:
+            self._info.min_size = (min_width, min_height)
+            self._info.max_size = (max_width, max_height)
+            self._dirty = True
 
     def _update_floating(self):
+        # Floating moves are not layout positions, don't judge them for convergence
+        self._layout_check_frame = None
+
         with WindowProxyLock:
             self._has_floating_target = False
             self._applied_floating_target.assign(self._floating_target)
@@ -388,6 +490,11 @@ class WindowProxy:
 
         # Update actual information about this window
         self._update_info()
+
+        # Check whether the window settled on the layout position we gave it
+        if self._layout_check_frame is not None and WindowProxy.UpdateFrameCounter >= self._layout_check_frame:
+            self._check_layout_convergence()
+
         if self._dirty:
             self._transfer_info()
 
@@ -409,6 +516,14 @@ class WindowProxy:
             self._floating_target.assign(new_position)
             self._has_floating_target = True
 
+    def apply_floating_now(self):
+        """ Apply the floating target from the proxy thread right away instead of on its next update. """
+        ProxyCommands.queue(self._apply_pending_floating)
+
+    def _apply_pending_floating(self):
+        if self._has_floating_target:
+            self._update_floating()
+
     def _zorder_top(self):
         zpos = winfuncs.HWND_TOP
         if self._proxy_always_top:
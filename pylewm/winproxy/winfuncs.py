@@ -278,6 +278,18 @@ class KBDLLHOOKSTRUCT(c.Structure):
 def CastToKbDllHookStruct(lParam):
     return c.cast(lParam, c.POINTER(KBDLLHOOKSTRUCT))[0]
 
+class MSLLHOOKSTRUCT(c.Structure):
+    _fields_ = (
+        ('pt',              w.POINT),
+        ('mouseData',       w.DWORD),
+        ('flags',           w.DWORD),
+        ('time',            w.DWORD),
+        ('dwExtraInfo',     c.POINTER(w.ULONG)),
+    )
+
+def CastToMsLlHookStruct(lParam):
+    return c.cast(lParam, c.POINTER(MSLLHOOKSTRUCT))[0]
+
 GetMessageW = c.WINFUNCTYPE(
     w.BOOL,
     w.LPMSG, w.HWND, w.UINT, w.UINT,
@@ -456,4 +468,157 @@ def GetExecutableOfWindow(hwnd):
 
 GetLastError = c.WINFUNCTYPE(
     w.DWORD,
-)(("GetLastError", c.windll.kernel32))
\ No newline at end of file
+)(("GetLastError", c.windll.kernel32))
+
+class PROCESS_MEMORY_COUNTERS(c.Structure):
+    _fields_ = [
+        ("cb", w.DWORD),
+        ("PageFaultCount", w.DWORD),
+        ("PeakWorkingSetSize", c.c_size_t),
+        ("WorkingSetSize", c.c_size_t),
+        ("QuotaPeakPagedPoolUsage", c.c_size_t),
+        ("QuotaPagedPoolUsage", c.c_size_t),
+        ("QuotaPeakNonPagedPoolUsage", c.c_size_t),
+        ("QuotaNonPagedPoolUsage", c.c_size_t),
+        ("PagefileUsage", c.c_size_t),
+        ("PeakPagefileUsage", c.c_size_t),
+    ]
+
+def GetCurrentWorkingSetSize():
+    try:
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = c.sizeof(PROCESS_MEMORY_COUNTERS)
+        c.windll.psapi.GetProcessMemoryInfo(c.windll.kernel32.GetCurrentProcess(), c.byref(counters), counters.cb)
+        return counters.WorkingSetSize
+    except:
+        return 0
+
+class BITMAPINFOHEADER(c.Structure):
+    _fields_ = [
+        ("biSize", w.DWORD),
+        ("biWidth", w.LONG),
+        ("biHeight", w.LONG),
+        ("biPlanes", w.WORD),
+        ("biBitCount", w.WORD),
+        ("biCompression", w.DWORD),
+        ("biSizeImage", w.DWORD),
+        ("biXPelsPerMeter", w.LONG),
+        ("biYPelsPerMeter", w.LONG),
+        ("biClrUsed", w.DWORD),
+        ("biClrImportant", w.DWORD),
+    ]
+
+GetDC = c.WINFUNCTYPE(
+    w.HDC,
+    w.HWND,
+)(("GetDC", c.windll.user32))
+
+ReleaseDC = c.WINFUNCTYPE(
+    c.c_int,
+    w.HWND, w.HDC,
+)(("ReleaseDC", c.windll.user32))
+
+CreateCompatibleDC = c.WINFUNCTYPE(
+    w.HDC,
+    w.HDC,
+)(("CreateCompatibleDC", c.windll.gdi32))
+
+CreateCompatibleBitmap = c.WINFUNCTYPE(
+    w.HBITMAP,
+    w.HDC, c.c_int, c.c_int,
+)(("CreateCompatibleBitmap", c.windll.gdi32))
+
+SelectObject = c.WINFUNCTYPE(
+    w.HGDIOBJ,
+    w.HDC, w.HGDIOBJ,
+)(("SelectObject", c.windll.gdi32))
+
+DeleteObject = c.WINFUNCTYPE(
+    w.BOOL,
+    w.HGDIOBJ,
+)(("DeleteObject", c.windll.gdi32))
+
+DeleteDC = c.WINFUNCTYPE(
+    w.BOOL,
+    w.HDC,
+)(("DeleteDC", c.windll.gdi32))
+
+BitBlt = c.WINFUNCTYPE(
+    w.BOOL,
+    w.HDC, c.c_int, c.c_int, c.c_int, c.c_int, w.HDC, c.c_int, c.c_int, w.DWORD,
+)(("BitBlt", c.windll.gdi32))
+
+GetDIBits = c.WINFUNCTYPE(
+    c.c_int,
+    w.HDC, w.HBITMAP, w.UINT, w.UINT, w.LPVOID, c.POINTER(BITMAPINFOHEADER), w.UINT,
+)(("GetDIBits", c.windll.gdi32))
+
+BeginPaint = c.WINFUNCTYPE(
+    w.HDC,
+    w.HWND, c.POINTER(PAINTSTRUCT),
+)(("BeginPaint", c.windll.user32))
+
+EndPaint = c.WINFUNCTYPE(
+    w.BOOL,
+    w.HWND, c.POINTER(PAINTSTRUCT),
+)(("EndPaint", c.windll.user32))
+
+CreateSolidBrush = c.WINFUNCTYPE(
+    w.HBRUSH,
+    w.COLORREF,
+)(("CreateSolidBrush", c.windll.gdi32))
+
+CreateFontW = c.WINFUNCTYPE(
+    w.HFONT,
+    c.c_int, c.c_int, c.c_int, c.c_int, c.c_int,
+    w.DWORD, w.DWORD, w.DWORD, w.DWORD, w.DWORD, w.DWORD, w.DWORD, w.DWORD,
+    w.LPCWSTR,
+)(("CreateFontW", c.windll.gdi32))
+
+Rectangle = c.WINFUNCTYPE(
+    w.BOOL,
+    w.HDC, c.c_int, c.c_int, c.c_int, c.c_int,
+)(("Rectangle", c.windll.gdi32))
+
+SetBkMode = c.WINFUNCTYPE(
+    c.c_int,
+    w.HDC, c.c_int,
+)(("SetBkMode", c.windll.gdi32))
+
+SetTextColor = c.WINFUNCTYPE(
+    w.COLORREF,
+    w.HDC, w.COLORREF,
+)(("SetTextColor", c.windll.gdi32))
+
+DrawTextW = c.WINFUNCTYPE(
+    c.c_int,
+    w.HDC, w.LPCWSTR, c.c_int, c.POINTER(w.RECT), w.UINT,
+)(("DrawTextW", c.windll.user32))
+
+SRCCOPY = 0x00CC0020
+BI_RGB = 0
+DIB_RGB_COLORS = 0
+
+def CopyScreenPixels(left, top, width, height, buffer_address):
+    """ Copy a rect of the screen into a top-down 32-bit BGRA buffer of width*height*4 bytes. """
+    screen_dc = GetDC(None)
+    memory_dc = CreateCompatibleDC(screen_dc)
+    bitmap = CreateCompatibleBitmap(screen_dc, width, height)
+    try:
+        previous = SelectObject(memory_dc, bitmap)
+        BitBlt(memory_dc, 0, 0, width, height, screen_dc, left, top, SRCCOPY)
+        # The bitmap can't be selected into a DC while its bits are read
+        SelectObject(memory_dc, previous)
+
+        header = BITMAPINFOHEADER()
+        header.biSize = c.sizeof(BITMAPINFOHEADER)
+        header.biWidth = width
+        header.biHeight = -height # Negative for top-down rows
+        header.biPlanes = 1
+        header.biBitCount = 32
+        header.biCompression = BI_RGB
+        return GetDIBits(memory_dc, bitmap, 0, height, buffer_address, c.byref(header), DIB_RGB_COLORS)
+    finally:
+        DeleteObject(bitmap)
+        DeleteDC(memory_dc)
+        ReleaseDC(None, screen_dc)
@@ -13,6 +13,7 @@ setup(
         "python-levenshtein>=0.12.0",
         "pylnk3>=0.4.2",
         "pywinauto==0.6.8",
+        "numpy>=1.19.0",
     ],
     package_data={
         "pylewm": ["PyleWM.png", "data/*"],